@@ -0,0 +1,102 @@
+import base64
+import json
+import shlex
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List
+
+from mylittleansible.core.executor import RESULT_MARKER
+from mylittleansible.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+EXECUTOR_PATH = Path(__file__).with_name("executor.py")
+PAYLOAD_MARKER = "MLA:"
+
+# Reads the payload line from stdin, skipping the sudo password line when sudo did not prompt for it.
+BOOTSTRAP = (
+    "import sys,zlib,base64\n"
+    "for line in sys.stdin:\n"
+    f"    if line.startswith({PAYLOAD_MARKER!r}):\n"
+    f"        exec(zlib.decompress(base64.b64decode(line[{len(PAYLOAD_MARKER)}:])), {{'__name__': '__mla__'}})\n"
+    "        break\n"
+)
+
+
+def build_payload(tasks: List[Dict[str, Any]]) -> str:
+    """
+    Serialise a host task list and the remote executor into one compressed payload.
+
+    :param tasks: The tasks to execute on the host.
+    :type tasks: list
+    :return: The base64 encoded, zlib compressed python program.
+    :rtype: str
+    """
+    program = EXECUTOR_PATH.read_text(encoding="utf-8")
+    program += f"\n\nmain(json.loads({json.dumps(tasks)!r}))\n"
+    return base64.b64encode(zlib.compress(program.encode("utf-8"), 9)).decode("ascii")
+
+
+def build_tasks(modules: List) -> List[Dict[str, Any]]:
+    """
+    Describe the modules as the task list of a bundle.
+
+    :param modules: The modules to execute, in order.
+    :type modules: list
+    :rtype: list
+    """
+    # Loop items share their task index, so results are matched back to modules by position.
+    return [dict(module.to_task(), index=position) for position, module in enumerate(modules)]
+
+
+def execute_bundle(ssh_manager, modules: List, payload: str) -> List[Dict[str, Any]]:
+    """
+    Run every module on the host through a single remote python process.
+
+    The payload does not depend on the host, so it is built once with `build_payload(build_tasks(modules))`
+    and shipped to every host.
+
+    :param ssh_manager: The SSHManager instance to use to execute the bundle.
+    :type ssh_manager: SSHManager
+    :param modules: The modules to execute, in order.
+    :type modules: list
+    :param payload: The payload built from the tasks of `modules`.
+    :type payload: str
+    :return: One result per task, as reported by the remote executor.
+    :rtype: list
+    """
+    logger.debug(f"host={ssh_manager.hostname} bundle of {len(modules)} task(s), {len(payload)} bytes")
+
+    command = f"sudo -S -p '' python3 -c {shlex.quote(BOOTSTRAP)}"
+    stdin, stdout, stderr = ssh_manager.run_command(command)
+    if ssh_manager.password:
+        stdin.write(f"{ssh_manager.password}\n")
+    stdin.write(f"{PAYLOAD_MARKER}{payload}\n")
+    stdin.flush()
+    stdin.close()
+
+    output = stdout.read().decode(errors="replace")
+    exit_status = stdout.channel.recv_exit_status()
+
+    results = []
+    for line in output.splitlines():
+        if not line.startswith(RESULT_MARKER):
+            continue
+        result = json.loads(line[len(RESULT_MARKER) :])
+        module = modules[result["index"]]
+        if result["rc"] != 0:
+            logger.error(
+                f"[{module.index}] host={ssh_manager.hostname} op={module.name} Error while executing task: {result['stderr'][:200]}"
+            )
+        for item in result.get("items", [{"index": module.index, "rc": result["rc"]}]):
+            logger.info(
+                f"[{item['index']}] host={ssh_manager.hostname} op={module.name} rc={item['rc']} changed={result['changed']}"
+            )
+        results.append(result)
+
+    # A failed task ends the bundle early on purpose; anything else cut short is an error of its own.
+    if exit_status != 0 or (len(results) != len(modules) and all(result["rc"] == 0 for result in results)):
+        logger.error(
+            f"host={ssh_manager.hostname} bundle stopped after {len(results)}/{len(modules)} task(s): {stderr.read().decode(errors='replace')[:200]}"
+        )
+    return results
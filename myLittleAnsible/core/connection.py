@@ -0,0 +1,335 @@
+import errno
+import fcntl
+import io
+import os
+import pty
+import shutil
+import subprocess
+import termios
+import threading
+from typing import Optional
+
+from mylittleansible.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Connection:
+    """
+    Base class for the transports used by modules to reach a host.
+
+    `run_command` returns a `(stdin, stdout, stderr)` triple behaving like paramiko's: `stdin`
+    accepts `write`/`flush`/`close`, `stdout`/`stderr` return bytes from `read` and
+    `stdout.channel.recv_exit_status()` waits for the exit status.
+    """
+
+    hostname: str
+    password: Optional[str] = None
+
+    def connect(self) -> None:
+        """
+        Establishes the connection to the host.
+        """
+        raise NotImplementedError("This method must be implemented by the subclass.")
+
+    def run_command(self, command, pty=False) -> tuple:
+        """
+        Run the command passed in parameter.
+
+        :param command: The command to run on the host.
+        :type command: str
+        :param pty: Request a pseudo-terminal for the command. Defaults to False.
+        :type pty: bool
+        """
+        raise NotImplementedError("This method must be implemented by the subclass.")
+
+    def open_sftp(self):
+        """
+        Open an SFTP-like session (put, putfo, open, stat, mkdir, chdir, rename, remove, close) on the host.
+        """
+        raise NotImplementedError("This method must be implemented by the subclass.")
+
+    def put(self, local_path: str, remote_path: str) -> None:
+        """
+        Copy a local file to the host.
+
+        :param local_path: The local file path.
+        :type local_path: str
+        :param remote_path: The destination path on the host.
+        :type remote_path: str
+        """
+        sftp_session = self.open_sftp()
+        try:
+            sftp_session.put(local_path, remote_path)
+        finally:
+            sftp_session.close()
+
+    def putfo(self, fl, remote_path: str) -> None:
+        """
+        Copy the content of an open file-like object to the host.
+
+        :param fl: The file-like object to read from.
+        :param remote_path: The destination path on the host.
+        :type remote_path: str
+        """
+        sftp_session = self.open_sftp()
+        try:
+            sftp_session.putfo(fl, remote_path)
+        finally:
+            sftp_session.close()
+
+    def is_active(self) -> bool:
+        """
+        Check whether the connection is established and still alive.
+
+        :rtype: bool
+        """
+        raise NotImplementedError("This method must be implemented by the subclass.")
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        """
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class LocalChannel:
+    """
+    Output and exit status of a local process, mirroring paramiko's `Channel`.
+
+    Like paramiko, which buffers whatever the server sends, the process output is drained into
+    memory by reader threads as soon as it starts, so a process writing more than a pipe (or
+    pseudo-terminal) buffer never blocks on a caller waiting for its exit status first.
+    """
+
+    def __init__(self, process: subprocess.Popen, stdout, stderr=None) -> None:
+        self.process = process
+        self.buffers = {"stdout": [], "stderr": []}
+        self.readers = {}
+        for name, fileobj in (("stdout", stdout), ("stderr", stderr)):
+            if fileobj is None:
+                continue
+            reader = threading.Thread(target=self._drain, args=(fileobj, self.buffers[name]), daemon=True)
+            reader.start()
+            self.readers[name] = reader
+
+    @staticmethod
+    def _drain(fileobj, buffer: list) -> None:
+        try:
+            while True:
+                try:
+                    chunk = fileobj.read(65536)
+                except OSError as e:
+                    # A pseudo-terminal reports EIO once the process closed its side.
+                    if e.errno != errno.EIO:
+                        raise
+                    break
+                if not chunk:
+                    break
+                buffer.append(chunk)
+        finally:
+            fileobj.close()
+
+    def read(self, name: str) -> bytes:
+        """
+        Wait for the end of the given output stream and return what was not read yet.
+
+        :param name: `stdout` or `stderr`.
+        :type name: str
+        :rtype: bytes
+        """
+        if name in self.readers:
+            self.readers[name].join()
+        data = b"".join(self.buffers[name])
+        self.buffers[name].clear()
+        return data
+
+    def recv_exit_status(self) -> int:
+        return self.process.wait()
+
+
+class LocalStream:
+    """
+    Write end of a local process pipe or pseudo-terminal, accepting str writes like paramiko's ChannelFile.
+    """
+
+    def __init__(self, fileobj, channel: LocalChannel) -> None:
+        self.fileobj = fileobj
+        self.channel = channel
+
+    def write(self, data) -> None:
+        if isinstance(data, str):
+            data = data.encode()
+        try:
+            self.fileobj.write(data)
+        except BrokenPipeError:
+            # The process exited without reading its input, which paramiko silently ignores too.
+            pass
+
+    def flush(self) -> None:
+        try:
+            self.fileobj.flush()
+        except BrokenPipeError:
+            pass
+
+    def close(self) -> None:
+        try:
+            self.fileobj.close()
+        except BrokenPipeError:
+            pass
+
+
+class LocalOutput:
+    """
+    Read end of a local process output, served from the buffers of its channel.
+    """
+
+    def __init__(self, channel: LocalChannel, name: str) -> None:
+        self.channel = channel
+        self.name = name
+
+    def read(self) -> bytes:
+        return self.channel.read(self.name)
+
+    def close(self) -> None:
+        pass
+
+
+def _acquire_controlling_terminal() -> None:
+    """
+    Make the pseudo-terminal the controlling terminal of the child, so that sudo prompts on it.
+    """
+    fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+
+
+class LocalFile(io.FileIO):
+    """
+    Binary file opened by LocalSFTP, with the paramiko `SFTPFile` methods used by modules.
+    """
+
+    def chmod(self, mode: int) -> None:
+        os.chmod(self.fileno(), mode)
+
+    def set_pipelined(self, pipelined: bool = True) -> None:
+        pass
+
+
+class LocalSFTP:
+    """
+    SFTP-like session over the local filesystem, implementing the subset of paramiko's SFTPClient used by modules.
+    """
+
+    def __init__(self) -> None:
+        self.cwd: Optional[str] = None
+
+    def _path(self, path: str) -> str:
+        return os.path.join(self.cwd, path) if self.cwd else path
+
+    def put(self, local_path: str, remote_path: str) -> None:
+        shutil.copyfile(local_path, self._path(remote_path))
+
+    def putfo(self, fl, remote_path: str) -> int:
+        with open(self._path(remote_path), "wb") as f:
+            shutil.copyfileobj(fl, f)
+            return f.tell()
+
+    def open(self, path: str, mode: str = "r") -> LocalFile:
+        return LocalFile(self._path(path), mode.replace("b", ""))
+
+    def stat(self, path: str) -> os.stat_result:
+        return os.stat(self._path(path))
+
+    def mkdir(self, path: str, mode: int = 0o777) -> None:
+        os.mkdir(self._path(path), mode)
+
+    def chdir(self, path: Optional[str] = None) -> None:
+        if path is not None and not os.path.isdir(self._path(path)):
+            raise IOError(errno.ENOENT, f"No such directory: {path}")
+        self.cwd = None if path is None else os.path.abspath(self._path(path))
+
+    def rename(self, old_path: str, new_path: str) -> None:
+        os.rename(self._path(old_path), self._path(new_path))
+
+    def remove(self, path: str) -> None:
+        os.remove(self._path(path))
+
+    def close(self) -> None:
+        pass
+
+
+class LocalConnection(Connection):
+    """
+    Run commands and copy files on the controller itself, without SSH.
+    """
+
+    def __init__(self, hostname: str = "localhost", password: Optional[str] = None) -> None:
+        """
+        :param hostname: The name to report for the host in logs. Defaults to localhost.
+        :type hostname: str
+        :param password: The sudo password of the current user. Optional.
+        :type password: str, optional
+        """
+        self.hostname = hostname
+        self.password = password
+
+    @classmethod
+    def from_host(cls, host) -> "LocalConnection":
+        """
+        Build a LocalConnection from an inventory host record.
+
+        :param host: The host to run on.
+        :type host: Host
+        :rtype: LocalConnection
+        """
+        return cls(hostname=host.address, password=host.password)
+
+    def connect(self) -> None:
+        pass
+
+    def run_command(self, command, pty=False) -> tuple:
+        """
+        Run the command in a local shell, on a pseudo-terminal when `pty` is requested (e.g. for sudo prompts).
+
+        :param command: The command to run.
+        :type command: str
+        :param pty: Request a pseudo-terminal for the command. Defaults to False.
+        :type pty: bool
+        """
+        if pty:
+            return self._run_on_pty(command)
+        process = subprocess.Popen(
+            command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        channel = LocalChannel(process, process.stdout, process.stderr)
+        return LocalStream(process.stdin, channel), LocalOutput(channel, "stdout"), LocalOutput(channel, "stderr")
+
+    def _run_on_pty(self, command) -> tuple:
+        master, slave = pty.openpty()
+        try:
+            process = subprocess.Popen(
+                command,
+                shell=True,
+                stdin=slave,
+                stdout=slave,
+                stderr=slave,
+                start_new_session=True,
+                preexec_fn=_acquire_controlling_terminal,
+            )
+        finally:
+            os.close(slave)
+        # Like an SSH pty, stdin and stdout share the terminal and stderr is merged into stdout.
+        channel = LocalChannel(process, os.fdopen(os.dup(master), "rb", buffering=0))
+        stdin = LocalStream(os.fdopen(master, "wb", buffering=0), channel)
+        return stdin, LocalOutput(channel, "stdout"), LocalOutput(channel, "stderr")
+
+    def open_sftp(self) -> LocalSFTP:
+        return LocalSFTP()
+
+    def is_active(self) -> bool:
+        return True
@@ -0,0 +1,253 @@
+"""
+Self-contained task executor shipped to remote hosts in bundled mode.
+
+This file is compressed together with the host task list and executed by the
+remote python3 interpreter, so it must only depend on the standard library and
+must not import anything from mylittleansible. The sysctl helpers defined here are
+also imported by the sysctl module, so both execution paths share one implementation.
+"""
+
+import base64
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+
+RESULT_MARKER = "MLA-RESULT:"
+
+
+def _run(command):
+    """
+    Run a shell command on the local system.
+
+    :param command: The shell command to run.
+    :type command: str
+    :return: The exit status, stdout and stderr of the command.
+    :rtype: tuple
+    """
+    env = dict(os.environ, DEBIAN_FRONTEND="noninteractive")
+    proc = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    return proc.returncode, proc.stdout.decode(errors="replace"), proc.stderr.decode(errors="replace")
+
+
+def _write_file(path, data, mode=None):
+    """
+    Atomically write `data` to `path` unless the file already has this content.
+
+    :param path: The destination file path.
+    :type path: str
+    :param data: The file content.
+    :type data: bytes
+    :param mode: The permissions to apply to the file. Optional.
+    :type mode: int, optional
+    :return: True if the file was written, False if it was already up to date.
+    :rtype: bool
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".mla-tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    if mode is not None:
+        os.chmod(tmp_path, mode)
+    os.replace(tmp_path, path)
+    return True
+
+
+def _command_result(rc, stdout, stderr):
+    return {"rc": rc, "stdout": stdout, "stderr": stderr, "changed": rc == 0}
+
+
+def _batch_result(results):
+    """
+    Combine the per-item results of a loop task, keeping them for per-item reporting.
+    """
+    return {
+        "rc": max([result["rc"] for result in results] or [0]),
+        "stdout": "".join(result["stdout"] for result in results),
+        "stderr": "".join(result["stderr"] for result in results),
+        "changed": any(result["changed"] for result in results),
+        "items": [{"index": result["index"], "rc": result["rc"]} for result in results],
+    }
+
+
+def op_command(task):
+    results = [dict(_command_result(*_run(entry["command"])), index=entry["index"]) for entry in task["commands"]]
+    return _batch_result(results)
+
+
+def op_apt(task):
+    packages = task["packages"]
+    results = []
+    for action, selected in (
+        ("install", [package for package in packages if package.get("state") != "absent"]),
+        ("remove", [package for package in packages if package.get("state") == "absent"]),
+    ):
+        if selected:
+            names = " ".join(shlex.quote(str(package["name"])) for package in selected)
+            result = _command_result(*_run("apt-get -y %s %s" % (action, names)))
+            results.extend(dict(result, index=package["index"]) for package in selected)
+    return _batch_result(results)
+
+
+def op_service(task):
+    return _command_result(*_run("service %s %s" % (task["name"], task["state"])))
+
+
+def normalize_value(value):
+    """
+    Normalize a sysctl value so that multi-field values compare equal whatever their whitespace.
+
+    :param value: The sysctl value.
+    :rtype: str
+    """
+    return " ".join(str(value).split())
+
+
+def parse_sysctl_output(output):
+    """
+    Parse `key = value` lines as printed by `sysctl` or found in a sysctl.d file.
+
+    :param output: The text to parse.
+    :type output: str
+    :return: The values by key.
+    :rtype: dict
+    """
+    values = {}
+    for line in output.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", ";")) or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        values[key.strip()] = normalize_value(value)
+    return values
+
+
+def render_dropin(current_content, entries, header):
+    """
+    Merge the permanent entries into the existing drop-in file content.
+
+    Keys already present are updated in place, other lines are kept and new keys are appended.
+
+    :param current_content: The current content of the drop-in file.
+    :type current_content: str
+    :param entries: The permanent entries to write.
+    :type entries: list
+    :param header: The comment line heading the drop-in file.
+    :type header: str
+    :rtype: str
+    """
+    wanted = {entry["attribute"]: normalize_value(entry["value"]) for entry in entries}
+    lines = []
+    for line in current_content.splitlines():
+        key = line.split("=", 1)[0].strip() if "=" in line and not line.lstrip().startswith(("#", ";")) else None
+        if line == header:
+            continue
+        if key in wanted:
+            lines.append("%s = %s" % (key, wanted.pop(key)))
+        else:
+            lines.append(line)
+    lines.extend("%s = %s" % item for item in wanted.items())
+    return "\n".join([header] + lines) + "\n"
+
+
+def op_sysctl(task):
+    entries = task["entries"]
+    _, current_output, _ = _run("sysctl -e " + " ".join(shlex.quote(entry["attribute"]) for entry in entries))
+    current = parse_sysctl_output(current_output)
+    changed = [entry for entry in entries if current.get(entry["attribute"]) != normalize_value(entry["value"])]
+
+    rc, stdout, stderr = 0, "", ""
+    reloaded = {}
+    permanent = [entry for entry in entries if entry["permanent"]]
+    if permanent:
+        try:
+            with open(task["file"]) as f:
+                old_content = f.read()
+        except OSError:
+            old_content = ""
+        content = render_dropin(old_content, permanent, task["header"])
+        written = _write_file(task["file"], content.encode(), 0o644)
+        if written or any(entry["permanent"] for entry in changed):
+            rc, stdout, stderr = _run("sysctl --load %s >/dev/null" % shlex.quote(task["file"]))
+            reloaded = parse_sysctl_output(content)
+
+    runtime = [
+        entry for entry in entries if not entry["permanent"] and (entry in changed or entry["attribute"] in reloaded)
+    ]
+    if rc == 0 and runtime:
+        assignments = " ".join(
+            shlex.quote("%s=%s" % (entry["attribute"], normalize_value(entry["value"]))) for entry in runtime
+        )
+        rc, stdout, stderr = _run("sysctl -q -w " + assignments)
+    return {"rc": rc, "stdout": stdout, "stderr": stderr, "changed": bool(changed)}
+
+
+def op_copy(task):
+    if "items" in task:
+        return _batch_result([dict(op_copy(item), index=item["index"]) for item in task["items"]])
+
+    dest = task["dest"]
+    changed = False
+
+    if task.get("backup"):
+        if task["kind"] == "file":
+            name = task["files"][0]["path"]
+            current = os.path.join(dest, name)
+            if os.path.isfile(current):
+                os.makedirs("/tmp" + dest, exist_ok=True)
+                shutil.move(current, "/tmp" + os.path.join(dest, name) + ".backup")
+        elif os.path.isdir(dest):
+            os.makedirs(os.path.dirname("/tmp" + dest.rstrip("/")), exist_ok=True)
+            shutil.move(dest, "/tmp" + dest.rstrip("/") + ".backup")
+
+    for entry in task["files"]:
+        data = base64.b64decode(entry["data"])
+        changed |= _write_file(os.path.join(dest, entry["path"]), data, entry.get("mode"))
+    return {"rc": 0, "stdout": "", "stderr": "", "changed": changed}
+
+
+def op_template(task):
+    changed = _write_file(task["dest"], base64.b64decode(task["data"]), 0o644)
+    return {"rc": 0, "stdout": "", "stderr": "", "changed": changed}
+
+
+OPERATIONS = {
+    "command": op_command,
+    "apt": op_apt,
+    "service": op_service,
+    "sysctl": op_sysctl,
+    "copy": op_copy,
+    "template": op_template,
+}
+
+
+def main(tasks):
+    """
+    Execute the tasks in order and emit one JSON result line per task.
+
+    Like the per-task runner, the remaining tasks are skipped once a task failed.
+
+    :param tasks: The tasks to execute, as built by `BaseModule.to_task`.
+    :type tasks: list
+    """
+    for task in tasks:
+        result = {"index": task["index"], "module": task["module"]}
+        try:
+            result.update(OPERATIONS[task["module"]](task))
+        except Exception as e:
+            result.update(rc=1, stdout="", stderr=str(e), changed=False)
+        sys.stdout.write(RESULT_MARKER + json.dumps(result) + "\n")
+        sys.stdout.flush()
+        if result["rc"] != 0:
+            break
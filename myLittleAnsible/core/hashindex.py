@@ -0,0 +1,117 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+from mylittleansible.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "mylittleansible", "hashes.sqlite3"
+)
+# Below these thresholds the process pool start-up costs more than hashing inline.
+POOL_MIN_FILES = 8
+POOL_MIN_BYTES = 64 * 1024 * 1024
+
+
+def hash_file(path: str) -> Tuple[str, str]:
+    """
+    Compute the sha256 digest of a file through a memory-mapped read.
+
+    :param path: The file path.
+    :type path: str
+    :return: The path and its hexadecimal digest.
+    :rtype: tuple
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+    return path, digest.hexdigest()
+
+
+class HashIndex:
+    """
+    Persistent index of local file content digests, keyed on (path, size, mtime, inode).
+
+    Only files that are new or whose stat signature changed since the last run are rehashed,
+    in a process pool when there is enough work to make it worthwhile.
+    """
+
+    def __init__(self, index_path: Optional[str] = None) -> None:
+        """
+        Opens (and creates if needed) the index database.
+
+        :param index_path: The path of the index database. Defaults to the user cache directory.
+        :type index_path: str, optional
+        """
+        self.index_path = index_path or DEFAULT_INDEX_PATH
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        self.db = sqlite3.connect(self.index_path, timeout=30)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS files "
+            "(path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, digest TEXT)"
+        )
+
+    def digests(self, paths: Iterable[str]) -> Dict[str, str]:
+        """
+        Return the content digest of every file, hashing only the files missing from the index.
+
+        :param paths: The local file paths.
+        :type paths: Iterable[str]
+        :return: The sha256 hexadecimal digest by path, keyed with the paths as given.
+        :rtype: dict
+        """
+        result: Dict[str, str] = {}
+        misses: Dict[str, Tuple[str, int, int, int]] = {}
+        for path in paths:
+            absolute_path = os.path.abspath(path)
+            st = os.stat(absolute_path)
+            row = self.db.execute(
+                "SELECT digest FROM files WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                (absolute_path, st.st_size, st.st_mtime_ns, st.st_ino),
+            ).fetchone()
+            if row:
+                result[path] = row[0]
+            else:
+                misses[path] = (absolute_path, st.st_size, st.st_mtime_ns, st.st_ino)
+
+        if misses:
+            logger.debug(f"Hashing {len(misses)} new or changed file(s), {len(result)} served from the index")
+            for path, digest in self._hash(list(misses)):
+                result[path] = digest
+            self.db.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, digest) VALUES (?, ?, ?, ?, ?)",
+                [(*misses[path], result[path]) for path in misses],
+            )
+            self.db.commit()
+        return result
+
+    def _hash(self, paths: list) -> Iterable[Tuple[str, str]]:
+        """
+        Hash the files inline, or across every core when there are enough of them.
+
+        :param paths: The file paths to hash.
+        :type paths: list
+        """
+        total_size = sum(os.path.getsize(path) for path in paths)
+        if len(paths) == 1 or (len(paths) < POOL_MIN_FILES and total_size < POOL_MIN_BYTES):
+            return [hash_file(path) for path in paths]
+        with ProcessPoolExecutor() as pool:
+            return list(pool.map(hash_file, paths, chunksize=max(1, len(paths) // (4 * (os.cpu_count() or 1)))))
+
+    def close(self) -> None:
+        """
+        Closes the index database.
+        """
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,151 @@
+import sys
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+
+def _intern(value: Any) -> Any:
+    """
+    Intern string values so that hosts sharing a user, password or key file share one string object.
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+CONNECTIONS = ("ssh", "local")
+
+
+class Host:
+    """
+    Connection settings of a single inventory host.
+    """
+
+    __slots__ = ("name", "address", "port", "user", "password", "key_file", "connection")
+
+    def __init__(
+        self,
+        name: str,
+        address: str,
+        port: int = 22,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        key_file: Optional[str] = None,
+        connection: str = "ssh",
+    ) -> None:
+        """
+        Initializes the host record.
+
+        :param name: The name of the host in the inventory.
+        :type name: str
+        :param address: The hostname or IP address of the host.
+        :type address: str
+        :param port: The SSH port of the host. Defaults to 22.
+        :type port: int
+        :param user: The username for authentication. Optional.
+        :type user: str, optional
+        :param password: The password for authentication. Optional.
+        :type password: str, optional
+        :param key_file: The path to the SSH private key file. Optional.
+        :type key_file: str, optional
+        :param connection: The connection backend, `ssh` or `local`. Defaults to ssh.
+        :type connection: str
+        """
+        self.name = name
+        self.address = address
+        self.port = port
+        self.user = _intern(user)
+        self.password = _intern(password)
+        self.key_file = _intern(key_file)
+        self.connection = _intern(connection)
+
+    @classmethod
+    def from_dict(cls, name: str, details: Dict[str, Any]) -> "Host":
+        """
+        Build a host record from its inventory entry.
+
+        :param name: The name of the host in the inventory.
+        :type name: str
+        :param details: The inventory entry of the host.
+        :type details: dict
+        :raises ValueError: If the entry has no `ssh_address` or an unknown `connection`.
+        :rtype: Host
+        """
+        connection = details.get("connection", "ssh")
+        if connection not in CONNECTIONS:
+            raise ValueError(
+                f"The inventory host '{name}' has an unknown connection '{connection}', expected one of {CONNECTIONS}."
+            )
+        if connection == "ssh" and "ssh_address" not in details:
+            raise ValueError(f"The inventory host '{name}' is missing the 'ssh_address' key.")
+        return cls(
+            name=name,
+            address=details.get("ssh_address", "localhost"),
+            port=int(details.get("ssh_port", 22)),
+            user=details.get("ssh_user"),
+            password=details.get("ssh_password"),
+            key_file=details.get("ssh_key_file"),
+            connection=connection,
+        )
+
+    def _key(self) -> tuple:
+        return (self.name, self.address, self.port, self.user, self.password, self.key_file, self.connection)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Host) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return f"Host({self.name!r}, {self.address!r})"
+
+
+class Inventory:
+    """
+    Typed, memory-compact view over the hosts of an inventory file.
+    """
+
+    __slots__ = ("_hosts",)
+
+    def __init__(self, hosts: Iterable[Host]) -> None:
+        """
+        :param hosts: The hosts of the inventory.
+        :type hosts: Iterable[Host]
+        """
+        self._hosts = tuple(hosts)
+
+    @classmethod
+    def from_dict(cls, content: Dict[str, Any]) -> "Inventory":
+        """
+        Build the inventory from the parsed YAML content.
+
+        The raw host entries are popped from `content` while the records are built,
+        so the YAML dicts can be freed as soon as each host has been converted.
+
+        :param content: The parsed inventory YAML content.
+        :type content: dict
+        :rtype: Inventory
+        """
+        raw_hosts = content.get("hosts") or {}
+
+        def consume() -> Iterator[Host]:
+            # Popping by key from a snapshot of the names stays linear, unlike rescanning the dict each time.
+            for name in list(raw_hosts):
+                yield Host.from_dict(name, raw_hosts.pop(name))
+
+        return cls(consume())
+
+    def __iter__(self) -> Iterator[Host]:
+        return iter(self._hosts)
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+    def describe(self, limit: int = 5) -> str:
+        """
+        Summarise the inventory for logging without formatting every host.
+
+        :param limit: The maximum number of host addresses to include.
+        :type limit: int
+        :rtype: str
+        """
+        addresses = ", ".join(host.address for host in self._hosts[:limit])
+        more = ", ..." if len(self._hosts) > limit else ""
+        return f"{len(self._hosts)} host(s) [{addresses}{more}]"
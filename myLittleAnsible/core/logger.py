@@ -1,7 +1,13 @@
+import getpass
 import logging
+import logging.handlers
 import os
 
-current_user = os.getlogin()
+try:
+    current_user = os.getlogin()
+except OSError:
+    # No controlling terminal, e.g. under cron, CI or the test suite.
+    current_user = getpass.getuser()
 
 
 class CustomFormatter(logging.Formatter):
@@ -28,12 +34,36 @@ class CustomFormatter(logging.Formatter):
         return formatter.format(record)
 
 
+# Set in worker processes so that every record is forwarded to the parent process.
+log_queue = None
+
+
+def make_handler():
+    ch = logging.StreamHandler()
+    ch.setFormatter(CustomFormatter())
+    return ch
+
+
 def get_logger(name):
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)
-    ch = logging.StreamHandler()
-    ch.setFormatter(CustomFormatter())
+    ch = logging.handlers.QueueHandler(log_queue) if log_queue is not None else make_handler()
 
     if not logger.handlers:
         logger.addHandler(ch)
     return logger
+
+
+def redirect_to_queue(queue):
+    """
+    Forward the records of every mylittleansible logger to `queue`, to be emitted by the parent process.
+
+    :param queue: The multiprocessing queue read by the parent's QueueListener.
+    """
+    global log_queue
+    log_queue = queue
+    for name, logger in list(logging.root.manager.loggerDict.items()):
+        if name.startswith("mylittleansible") and isinstance(logger, logging.Logger) and logger.handlers:
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            logger.addHandler(logging.handlers.QueueHandler(queue))
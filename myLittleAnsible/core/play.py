@@ -0,0 +1,145 @@
+import math
+import threading
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from mylittleansible.core.inventory import Inventory
+from mylittleansible.core.logger import get_logger
+from mylittleansible.core.report import Report
+from mylittleansible.core.runner import Runner, make_throttles
+from mylittleansible.core.sharding import run_sharded
+
+logger = get_logger(__name__)
+
+PLAY_OPTIONS = ("serial", "max_fail_percentage")
+
+
+def parse_play(content: Union[List[Dict[str, Any]], Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Split the todos content into the task list and the play-level options.
+
+    The todos file is either a plain list of tasks, or a mapping with a `tasks` list and
+    optional `serial` and `max_fail_percentage` keys.
+
+    :param content: The parsed todos YAML content.
+    :type content: list or dict
+    :raises ValueError: If the mapping contains unknown play options.
+    :return: The tasks and the play options.
+    :rtype: tuple
+    """
+    if isinstance(content, list):
+        return content, {}
+    options = {key: value for key, value in content.items() if key != "tasks"}
+    unknown = set(options) - set(PLAY_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown play option(s): {', '.join(sorted(unknown))}")
+    return content["tasks"], options
+
+
+def batch_size(serial: Union[int, str, None], total: int) -> int:
+    """
+    Compute the number of hosts per batch from a `serial` count or percentage.
+
+    :param serial: A host count (e.g. 5) or a percentage of the inventory (e.g. "20%").
+    :type serial: int or str, optional
+    :param total: The number of hosts in the inventory.
+    :type total: int
+    :raises ValueError: If `serial` is neither a positive count nor a percentage.
+    :rtype: int
+    """
+    if serial is None:
+        return max(total, 1)
+    if isinstance(serial, str) and serial.strip().endswith("%"):
+        percentage = float(serial.strip()[:-1])
+        if not 0 < percentage <= 100:
+            raise ValueError(f"serial percentage must be in ]0, 100], got {serial!r}")
+        return max(1, math.ceil(total * percentage / 100))
+    size = int(serial)
+    if size < 1:
+        raise ValueError(f"serial must be a positive count or a percentage, got {serial!r}")
+    return size
+
+
+def fail_threshold(max_fail_percentage: Optional[float]) -> Optional[float]:
+    """
+    Validate the `max_fail_percentage` play option.
+
+    :param max_fail_percentage: The percentage of failed hosts in a batch above which the rollout stops.
+    :type max_fail_percentage: float, optional
+    :raises ValueError: If it is not a number between 0 and 100.
+    :rtype: float, optional
+    """
+    if max_fail_percentage is None:
+        return None
+    if isinstance(max_fail_percentage, bool) or not isinstance(max_fail_percentage, (int, float)):
+        raise ValueError(f"max_fail_percentage must be a number in [0, 100], got {max_fail_percentage!r}")
+    if not 0 <= max_fail_percentage <= 100:
+        raise ValueError(f"max_fail_percentage must be in [0, 100], got {max_fail_percentage!r}")
+    return float(max_fail_percentage)
+
+
+def serial_batches(inventory: Inventory, serial: Union[int, str, None]) -> Iterator[Inventory]:
+    """
+    Lazily split the inventory into consecutive batches of hosts.
+
+    :param inventory: The inventory to split.
+    :type inventory: Inventory
+    :param serial: A host count or a percentage of the inventory, None for a single batch.
+    :type serial: int or str, optional
+    """
+    size = batch_size(serial, len(inventory))
+    hosts = iter(inventory)
+    while True:
+        batch = Inventory(islice(hosts, size))
+        if not len(batch):
+            return
+        yield batch
+
+
+def run_play(
+    inventory: Inventory,
+    todos: List[Dict[str, Any]],
+    serial: Union[int, str, None] = None,
+    max_fail_percentage: Optional[float] = None,
+    workers: int = 1,
+    dry_run: bool = False,
+    bundled: bool = False,
+) -> Report:
+    """
+    Run the play batch after batch, stopping the rollout as soon as a batch fails too much.
+
+    :param inventory: The inventory to run on.
+    :type inventory: Inventory
+    :param todos: The tasks to run.
+    :type todos: list
+    :param serial: The batch size, as a host count or a percentage of the inventory. Optional.
+    :type serial: int or str, optional
+    :param max_fail_percentage: The percentage of failed hosts in a batch above which the rollout stops. Optional.
+    :type max_fail_percentage: float, optional
+    :param workers: The number of worker processes each batch is sharded across.
+    :type workers: int
+    :raises ValueError: If `serial` or `max_fail_percentage` is invalid.
+    :return: The consolidated report of the batches that ran.
+    :rtype: Report
+    """
+    # Validate the options before the first batch touches any host.
+    max_fail_percentage = fail_threshold(max_fail_percentage)
+    report = Report()
+    batches = math.ceil(len(inventory) / batch_size(serial, len(inventory)))
+    for number, batch in enumerate(serial_batches(inventory, serial), 1):
+        if batches > 1:
+            logger.info(f"Batch {number}/{batches}: {batch.describe()}")
+        if workers > 1:
+            batch_report = run_sharded(batch, todos, workers, dry_run=dry_run, bundled=bundled)
+        else:
+            throttles = make_throttles(todos, threading.BoundedSemaphore)
+            batch_report = Runner(batch, todos, dry_run=dry_run, bundled=bundled, throttles=throttles).run()
+        report.merge(batch_report)
+
+        failed_percentage = len(batch_report.failed) * 100 / len(batch)
+        if max_fail_percentage is not None and failed_percentage > max_fail_percentage:
+            logger.error(
+                f"Batch {number}/{batches}: {failed_percentage:.0f}% of hosts failed (max_fail_percentage={max_fail_percentage}), stopping the rollout"
+            )
+            break
+    return report
@@ -0,0 +1,77 @@
+from typing import Dict, Iterable, Type
+
+from mylittleansible.core.connection import Connection, LocalConnection
+from mylittleansible.core.inventory import Host
+from mylittleansible.core.logger import get_logger
+from mylittleansible.core.ssh import SSHManager
+
+logger = get_logger(__name__)
+
+BACKENDS: Dict[str, Type[Connection]] = {
+    "ssh": SSHManager,
+    "local": LocalConnection,
+}
+
+
+def open_connection(host: Host) -> Connection:
+    """
+    Build the (not yet connected) connection matching the `connection` backend of a host.
+
+    :param host: The host to connect to.
+    :type host: Host
+    :rtype: Connection
+    """
+    return BACKENDS[host.connection].from_host(host)
+
+
+class ConnectionPool:
+    """
+    Keep one open connection per host so that successive runs skip the SSH handshake.
+    """
+
+    def __init__(self) -> None:
+        self.connections: Dict[Host, Connection] = {}
+
+    def get(self, host: Host) -> Connection:
+        """
+        Return the open connection to `host`, connecting (again) if needed.
+
+        :param host: The host to connect to.
+        :type host: Host
+        :rtype: Connection
+        """
+        connection = self.connections.get(host)
+        if connection is None or not connection.is_active():
+            if connection is not None:
+                logger.debug(f"host={host.address} connection lost, reconnecting")
+                connection.close()
+            connection = open_connection(host)
+            connection.connect()
+            self.connections[host] = connection
+        return connection
+
+    def retain(self, hosts: Iterable[Host]) -> None:
+        """
+        Close the connections of the hosts that are not in `hosts`, e.g. after the inventory changed.
+
+        :param hosts: The hosts whose connections are kept.
+        :type hosts: Iterable[Host]
+        """
+        kept = set(hosts)
+        for host in [host for host in self.connections if host not in kept]:
+            logger.debug(f"host={host.address} left the inventory, closing its connection")
+            self.connections.pop(host).close()
+
+    def close(self) -> None:
+        """
+        Closes every pooled connection.
+        """
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,55 @@
+from typing import Dict, List
+
+
+class Report:
+    """
+    Per-host outcome of a run, small enough to be sent back from worker processes and merged.
+    """
+
+    def __init__(self) -> None:
+        self.ok: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+
+    def record(self, host_name: str, ok: bool) -> None:
+        """
+        Record the outcome of one task on one host.
+
+        :param host_name: The inventory name of the host.
+        :type host_name: str
+        :param ok: Whether the task succeeded.
+        :type ok: bool
+        """
+        counts = self.ok if ok else self.failed
+        counts[host_name] = counts.get(host_name, 0) + 1
+
+    def merge(self, other: "Report") -> None:
+        """
+        Add the outcomes of another report to this one.
+
+        :param other: The report to merge.
+        :type other: Report
+        """
+        for host_name, count in other.ok.items():
+            self.ok[host_name] = self.ok.get(host_name, 0) + count
+        for host_name, count in other.failed.items():
+            self.failed[host_name] = self.failed.get(host_name, 0) + count
+
+    @property
+    def failed_hosts(self) -> List[str]:
+        return list(self.failed)
+
+    def summary(self, limit: int = 10) -> str:
+        """
+        Summarise the report for logging.
+
+        :param limit: The maximum number of failed host names to include.
+        :type limit: int
+        :rtype: str
+        """
+        hosts = set(self.ok) | set(self.failed)
+        text = f"{len(hosts)} host(s) ok={sum(self.ok.values())} failed={sum(self.failed.values())}"
+        if self.failed:
+            names = ", ".join(self.failed_hosts[:limit])
+            more = ", ..." if len(self.failed) > limit else ""
+            text += f" failed_hosts=[{names}{more}]"
+        return text
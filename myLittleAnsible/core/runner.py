@@ -1,6 +1,12 @@
-from typing import Any, Dict, Type
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Type
+from jinja2.nativetypes import NativeEnvironment
+
+from mylittleansible.core.bundle import build_payload, build_tasks, execute_bundle
+from mylittleansible.core.inventory import Host, Inventory
 from mylittleansible.core.logger import get_logger
-from mylittleansible.core.ssh import SSHManager
+from mylittleansible.core.pool import open_connection
+from mylittleansible.core.report import Report
 from mylittleansible.modules.apt import AptModule
 from mylittleansible.modules.command import CommandModule
 from mylittleansible.modules.service import ServiceModule
@@ -11,42 +17,238 @@ from mylittleansible.modules.base import BaseModule
 
 logger = get_logger(__name__)
 
+loop_environment = NativeEnvironment()
+
+
+def _render_params(value: Any, context: Dict[str, Any]) -> Any:
+    """
+    Render the Jinja2 expressions of the task parameters, recursively.
+
+    A parameter made of a single expression keeps the native type of its value (e.g. `{{ item }}`).
+
+    :param value: The parameter value.
+    :param context: The template variables, i.e. the loop `item`.
+    :type context: dict
+    """
+    if isinstance(value, str) and ("{{" in value or "{%" in value):
+        return loop_environment.from_string(value).render(context)
+    if isinstance(value, dict):
+        return {key: _render_params(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_render_params(item, context) for item in value]
+    return value
+
+
+def loop_params(todo: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Expand the `loop:` of a task into the parameters of each item.
+
+    :param todo: The task definition.
+    :type todo: dict
+    :raises ValueError: If `loop` is not a list.
+    :return: The parameters of every item, or the task parameters when it has no loop.
+    :rtype: list
+    """
+    if "loop" not in todo:
+        return [todo["params"]]
+    if not isinstance(todo["loop"], list):
+        raise ValueError(f"The loop of module '{todo['module']}' should be a list of items.")
+    return [_render_params(todo["params"], {"item": item}) for item in todo["loop"]]
+
+
+def make_throttles(todos: List[Dict[str, Any]], factory: Callable[[int], Any]) -> Dict[int, Any]:
+    """
+    Create one semaphore per task with a `throttle: N` key.
+
+    :param todos: The tasks of the play.
+    :type todos: list
+    :param factory: Callable creating a bounded semaphore of the given value.
+    :type factory: Callable
+    :raises ValueError: If a throttle is not a positive integer.
+    :return: The semaphores by 1-based task index.
+    :rtype: dict
+    """
+    throttles = {}
+    for i, todo in enumerate(todos):
+        throttle = todo.get("throttle")
+        if throttle is None:
+            continue
+        if isinstance(throttle, bool) or not isinstance(throttle, int) or throttle < 1:
+            raise ValueError(f"Task {i + 1}: throttle must be a positive integer, got {throttle!r}")
+        throttles[i + 1] = factory(throttle)
+    return throttles
+
 
 class Runner:
     """
     Manages the execution of tasks on hosts defined in the inventory.
     """
 
-    def __init__(self, inventory: Dict[str, Any], todos: Dict[str, Any], dry_run) -> None:
+    def __init__(
+        self, inventory: Inventory, todos: Dict[str, Any], dry_run, bundled=False, pool=None, throttles=None
+    ) -> None:
         self.inventory = inventory
         self.todos = todos
         self.dry_run = dry_run
+        self.bundled = bundled
+        self.pool = pool
+        self.throttles = throttles or {}
+        self.report = Report()
 
-    def run(self) -> None:
+    def run(self, hosts: Optional[Iterable[Host]] = None, indices: Optional[Set[int]] = None) -> Report:
         """
         Executes each task defined in todos on appropriate hosts.
+
+        A host on which a task fails is skipped for the remaining tasks.
+
+        :param hosts: The hosts to run the tasks on. Defaults to every host of the inventory.
+        :type hosts: Iterable[Host], optional
+        :param indices: The 1-based indices of the tasks to run. Defaults to every task.
+        :type indices: set, optional
+        :return: The outcome of every task on every host.
+        :rtype: Report
         """
-        for i, todo in enumerate(self.todos):
-            module = self._load_module(todo["module"], todo["params"], i + 1)
-            self._execute_on_all_hosts(module)
+        hosts = self.inventory if hosts is None else hosts
+        modules = self._merge_adjacent(
+            [
+                module
+                for i, todo in enumerate(self.todos)
+                if indices is None or i + 1 in indices
+                for module in self._load_task(todo, i + 1)
+            ]
+        )
+
+        if self.bundled and not self.dry_run:
+            self._execute_bundled(modules, hosts)
+            return self.report
 
-    def _execute_on_all_hosts(self, module: BaseModule) -> None:
+        for module in modules:
+            self._execute_on_all_hosts(module, hosts)
+        return self.report
+
+    @contextmanager
+    def _connect(self, host: Host):
+        """
+        Open a connection to `host`, borrowing it from the connection pool when there is one.
+
+        :param host: The host to connect to.
+        :type host: Host
+        """
+        if self.pool is not None:
+            yield self.pool.get(host)
+            return
+        with open_connection(host) as ssh_client:
+            yield ssh_client
+
+    @contextmanager
+    def _throttle(self, indices: Iterable[int]):
+        """
+        Hold the throttle semaphore of every given task, shared with the other worker processes.
+
+        Semaphores are always acquired in task order so that bundles cannot deadlock each other.
+
+        :param indices: The 1-based indices of the tasks about to run.
+        :type indices: Iterable[int]
+        """
+        with ExitStack() as stack:
+            for index in sorted(indices):
+                if index in self.throttles:
+                    stack.enter_context(self.throttles[index])
+            yield
+
+    def _merge_adjacent(self, modules: List[BaseModule]) -> List[BaseModule]:
+        """
+        Merge runs of adjacent tasks whose module supports it (e.g. sysctl) into a single task.
+
+        :param modules: The modules in todos order.
+        :type modules: list
+        :return: The modules to execute.
+        :rtype: list
+        """
+        merged: List[BaseModule] = []
+        run: List[BaseModule] = []
+        for module in modules + [None]:
+            mergeable = module is not None and module.merge_adjacent and module.index not in self.throttles
+            if run and (not mergeable or type(module) is not type(run[0])):
+                merged.append(run[0] if len(run) == 1 else type(run[0]).batch(run))
+                run = []
+            if module is None:
+                break
+            if mergeable:
+                run.append(module)
+            else:
+                merged.append(module)
+        return merged
+
+    def _execute_bundled(self, modules: List[BaseModule], hosts: Iterable[Host]) -> None:
+        """
+        Helper method to ship the whole task list to each host as a single payload.
+
+        :param modules: The modules to execute on every host, in order.
+        :type modules: list
+        :param hosts: The hosts to execute the modules on.
+        :type hosts: Iterable[Host]
+        """
+        # Rendering templates and reading copy sources is host independent, so it is done once.
+        try:
+            payload = build_payload(build_tasks(modules))
+        except Exception as e:
+            logger.error(f"Error while building the bundle: {e}")
+            for host in hosts:
+                self.report.record(host.name, ok=False)
+            return
+
+        for host in hosts:
+            try:
+                with self._connect(host) as ssh_client, self._throttle(module.index for module in modules):
+                    results = execute_bundle(ssh_client, modules, payload)
+            except Exception as e:
+                logger.error(f"host={host.address} bundle failed: {e}")
+                self.report.record(host.name, ok=False)
+                continue
+            for result in results:
+                self.report.record(host.name, ok=result["rc"] == 0)
+            if len(results) < len(modules) and all(result["rc"] == 0 for result in results):
+                self.report.record(host.name, ok=False)
+
+    def _execute_on_all_hosts(self, module: BaseModule, hosts: Iterable[Host]) -> None:
         """
         Helper method to execute a given module on all hosts in the inventory.
 
         :param module: The module to execute on all hosts.
         :type module: BaseModule
+        :param hosts: The hosts to execute the module on.
+        :type hosts: Iterable[Host]
+        """
+        for host in hosts:
+            if host.name in self.report.failed:
+                continue
+            try:
+                with self._connect(host) as ssh_client, self._throttle([module.index]):
+                    module.process(ssh_client)
+            except Exception as e:
+                logger.error(f"[{module.index}] host={host.address} op={module.name} failed: {e}")
+                self.report.record(host.name, ok=False)
+            else:
+                self.report.record(host.name, ok=True)
+
+    def _load_task(self, todo: Dict[str, Any], index: int) -> List[BaseModule]:
+        """
+        Load the module(s) of a task, expanding its `loop:` items.
+
+        The items of a module that supports batching (apt, sysctl, copy, command) are merged into
+        one module applied in a single remote operation; other modules get one module per item.
+
+        :param todo: The task definition.
+        :type todo: dict
+        :param index: The index of the task in the list of tasks.
+        :type index: int
+        :rtype: list
         """
-        for host_name, host_details in self.inventory["hosts"].items():
-            with SSHManager(
-                hostname=host_details["ssh_address"],
-                port=host_details.get("ssh_port", 22),
-                username=host_details.get("ssh_user"),
-                password=host_details.get("ssh_password"),
-                key_filename=host_details.get("ssh_key_file"),
-            ) as ssh_client:
-                ssh_client.connect()
-                module.process(ssh_client)
+        modules = [self._load_module(todo["module"], params, index) for params in loop_params(todo)]
+        if "loop" in todo and len(modules) > 1 and modules[0].batchable:
+            return [type(modules[0]).batch(modules)]
+        return modules
 
     def _load_module(self, module_name: str, params: Dict[str, Any], index: int) -> BaseModule:
         """
@@ -0,0 +1,93 @@
+import logging.handlers
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from mylittleansible.core.inventory import Inventory
+from mylittleansible.core.logger import get_logger, make_handler, redirect_to_queue
+from mylittleansible.core.pool import ConnectionPool
+from mylittleansible.core.report import Report
+from mylittleansible.core.runner import Runner, make_throttles
+
+logger = get_logger(__name__)
+
+# Throttle semaphores of the current worker process, shared with the other workers.
+worker_throttles: Dict[int, Any] = {}
+
+
+def shard_inventory(inventory: Inventory, shards: int) -> List[Inventory]:
+    """
+    Split the inventory round-robin into at most `shards` non-empty inventories.
+
+    :param inventory: The inventory to split.
+    :type inventory: Inventory
+    :param shards: The number of shards.
+    :type shards: int
+    :rtype: list
+    """
+    buckets: List[list] = [[] for _ in range(max(1, min(shards, len(inventory))))]
+    for i, host in enumerate(inventory):
+        buckets[i % len(buckets)].append(host)
+    return [Inventory(bucket) for bucket in buckets]
+
+
+def _init_worker(queue, throttles: Dict[int, Any]) -> None:
+    """
+    Send the worker's log records to the parent process and keep the shared throttle semaphores.
+    """
+    redirect_to_queue(queue)
+    worker_throttles.update(throttles)
+
+
+def _run_shard(inventory: Inventory, todos: List[Dict[str, Any]], dry_run: bool, bundled: bool) -> Report:
+    """
+    Run every task on one shard of the inventory, with the worker's own connection pool.
+    """
+    with ConnectionPool() as pool:
+        return Runner(inventory, todos, dry_run, bundled=bundled, pool=pool, throttles=worker_throttles).run()
+
+
+def run_sharded(
+    inventory: Inventory, todos: List[Dict[str, Any]], workers: int, dry_run: bool = False, bundled: bool = False
+) -> Report:
+    """
+    Shard the inventory across worker processes, each running its shard through a Runner.
+
+    Paramiko does its key exchange, encryption and SFTP framing in Python under the GIL, so
+    separate processes are what lets the controller use more than one core. Logs are streamed
+    back to the parent as they are emitted and the per-shard reports are merged into one.
+    Tasks with a `throttle: N` key share a semaphore across the workers, so that at most N
+    hosts run them at the same time.
+
+    :param inventory: The inventory to run on.
+    :type inventory: Inventory
+    :param todos: The tasks to run.
+    :type todos: list
+    :param workers: The number of worker processes.
+    :type workers: int
+    :return: The consolidated report.
+    :rtype: Report
+    """
+    shards = shard_inventory(inventory, workers)
+    logger.info(f"Running {len(inventory)} host(s) across {len(shards)} worker process(es)")
+
+    queue = multiprocessing.Queue()
+    throttles = make_throttles(todos, multiprocessing.BoundedSemaphore)
+    listener = logging.handlers.QueueListener(queue, make_handler())
+    listener.start()
+    report = Report()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=len(shards), initializer=_init_worker, initargs=(queue, throttles)
+        ) as executor:
+            futures = {executor.submit(_run_shard, shard, todos, dry_run, bundled): shard for shard in shards}
+            for future in as_completed(futures):
+                try:
+                    report.merge(future.result())
+                except Exception as e:
+                    logger.error(f"Worker process failed: {e}")
+                    for host in futures[future]:
+                        report.record(host.name, ok=False)
+    finally:
+        listener.stop()
+    return report
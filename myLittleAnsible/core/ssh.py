@@ -3,13 +3,14 @@ from typing import Optional
 
 import paramiko
 
+from mylittleansible.core.connection import Connection
 from mylittleansible.core.logger import get_logger
 
 
 logger = get_logger(__name__)
 
 
-class SSHManager:
+class SSHManager(Connection):
     """
     Manage SSH connections to execute commands on remote hosts.
     """
@@ -44,6 +45,23 @@ class SSHManager:
         self.password: Optional[str] = password
         self.key_filename: Optional[str] = key_filename
 
+    @classmethod
+    def from_host(cls, host) -> "SSHManager":
+        """
+        Build an SSHManager from an inventory host record.
+
+        :param host: The host to connect to.
+        :type host: Host
+        :rtype: SSHManager
+        """
+        return cls(
+            hostname=host.address,
+            port=host.port,
+            username=host.user,
+            password=host.password,
+            key_filename=host.key_file,
+        )
+
     def connect(self) -> None:
         """
         Establishes an SSH connection to the specified server using either password, key file, or default SSH config.
@@ -80,16 +98,28 @@ class SSHManager:
             self.connect()
         return self.client.exec_command(command, get_pty=pty)
 
+    def open_sftp(self) -> paramiko.SFTPClient:
+        """
+        Open an SFTP session on the remote server.
+
+        :rtype: paramiko.SFTPClient
+        """
+        if self.client is None:
+            self.connect()
+        return self.client.open_sftp()
+
+    def is_active(self) -> bool:
+        """
+        Check whether the SSH connection is established and still alive.
+
+        :rtype: bool
+        """
+        transport = self.client.get_transport() if self.client else None
+        return bool(transport and transport.is_active())
+
     def close(self) -> None:
         """
         Closes the SSH connection.
         """
         if self.client:
             self.client.close()
-
-    def __enter__(self):
-        self.connect()
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
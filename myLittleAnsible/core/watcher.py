@@ -0,0 +1,217 @@
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from mylittleansible.core.inventory import Inventory
+from mylittleansible.core.logger import get_logger
+from mylittleansible.core.pool import ConnectionPool
+from mylittleansible.core.runner import Runner, loop_params
+
+logger = get_logger(__name__)
+
+
+def path_signature(path: str) -> Optional[tuple]:
+    """
+    Compute a cheap signature of a file or directory tree from its stat information.
+
+    :param path: The file or directory path.
+    :type path: str
+    :return: The signature, or None if the path does not exist.
+    :rtype: tuple, optional
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isdir(path):
+        return (st.st_mtime_ns, st.st_size)
+
+    entries = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            entries.append((os.path.relpath(os.path.join(root, name), path), st.st_mtime_ns, st.st_size))
+    return tuple(entries)
+
+
+class FileWatcher:
+    """
+    Detect changes to a set of files and directory trees by polling their stat signatures.
+    """
+
+    def __init__(self) -> None:
+        self.signatures: Dict[str, Optional[tuple]] = {}
+
+    def track(self, paths: Iterable[str]) -> None:
+        """
+        Set the watched paths, keeping the known signature of the paths already watched.
+
+        :param paths: The paths to watch.
+        :type paths: Iterable[str]
+        """
+        self.signatures = {
+            path: self.signatures[path] if path in self.signatures else path_signature(path) for path in set(paths)
+        }
+
+    def changed(self) -> Set[str]:
+        """
+        Return the watched paths modified since the previous call.
+
+        :rtype: set
+        """
+        changed = set()
+        for path, signature in self.signatures.items():
+            current = path_signature(path)
+            if current != signature:
+                self.signatures[path] = current
+                changed.add(path)
+        return changed
+
+
+def task_sources(todo: Dict[str, Any]) -> List[str]:
+    """
+    List the local files a task reads, i.e. the `src` of template and copy tasks and of their loop items.
+
+    :param todo: The task definition.
+    :type todo: dict
+    :rtype: list
+    """
+    if todo.get("module") not in ("template", "copy"):
+        return []
+    try:
+        return [params["src"] for params in loop_params(todo) if params.get("src")]
+    except Exception:
+        return []
+
+
+class Watcher:
+    """
+    Long-running controller that keeps connections warm and re-applies only what changed.
+
+    Edits to the todos file re-run the modified tasks, edits to a template or copy source
+    re-run the tasks using it, and hosts added to (or modified in) the inventory receive the
+    whole task list.
+    """
+
+    def __init__(
+        self,
+        inventory_file: str,
+        todos_file: str,
+        load_inventory: Callable[[], Inventory],
+        load_todos: Callable[[], list],
+        dry_run: bool = False,
+        bundled: bool = False,
+        interval: float = 0.5,
+    ) -> None:
+        """
+        :param inventory_file: Path to the inventory YAML file.
+        :type inventory_file: str
+        :param todos_file: Path to the tasks YAML file.
+        :type todos_file: str
+        :param load_inventory: Callable parsing the inventory file.
+        :type load_inventory: Callable
+        :param load_todos: Callable parsing the todos file.
+        :type load_todos: Callable
+        :param interval: Seconds between two polls of the watched files.
+        :type interval: float
+        """
+        self.inventory_file = inventory_file
+        self.todos_file = todos_file
+        self.load_inventory = load_inventory
+        self.load_todos = load_todos
+        self.dry_run = dry_run
+        self.bundled = bundled
+        self.interval = interval
+        self.pool = ConnectionPool()
+        self.files = FileWatcher()
+        self.inventory = load_inventory()
+        self.todos = load_todos()
+
+    def run(self) -> None:
+        """
+        Apply every task on every host, then re-apply incrementally until interrupted.
+        """
+        self._track()
+        self._apply(self.inventory, None)
+        logger.info(f"Watching {self.todos_file}, {self.inventory_file} and task sources, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(self.interval)
+                self.poll()
+        except KeyboardInterrupt:
+            logger.info("Stopping watch mode")
+        finally:
+            self.pool.close()
+
+    def poll(self) -> None:
+        """
+        Check the watched files once and re-apply the affected tasks on the affected hosts.
+        """
+        changed = self.files.changed()
+        if not changed:
+            return
+        started = time.monotonic()
+
+        new_hosts = []
+        if self.inventory_file in changed:
+            try:
+                inventory = self.load_inventory()
+            except Exception as e:
+                logger.error(f"Keeping the previous inventory: {e}")
+            else:
+                known = set(self.inventory)
+                new_hosts = [host for host in inventory if host not in known]
+                self.inventory = inventory
+                # Removed hosts, and the previous record of modified ones, no longer need a connection.
+                self.pool.retain(inventory)
+
+        indices: Set[int] = set()
+        if self.todos_file in changed:
+            try:
+                todos = self.load_todos()
+            except Exception as e:
+                logger.error(f"Keeping the previous todos: {e}")
+            else:
+                indices.update(i + 1 for i, todo in enumerate(todos) if i >= len(self.todos) or self.todos[i] != todo)
+                self.todos = todos
+                self._track()
+
+        for i, todo in enumerate(self.todos):
+            if changed.intersection(task_sources(todo)):
+                indices.add(i + 1)
+
+        if indices:
+            added = set(new_hosts)
+            self._apply([host for host in self.inventory if host not in added], indices)
+        if new_hosts:
+            self._apply(new_hosts, None)
+        if indices or new_hosts:
+            logger.info(
+                f"Re-applied {len(indices)} task(s), {len(new_hosts)} new host(s) in {time.monotonic() - started:.2f}s"
+            )
+
+    def _track(self) -> None:
+        """
+        Watch the inventory, the todos and the sources of the current tasks.
+        """
+        sources = [path for todo in self.todos for path in task_sources(todo)]
+        self.files.track([self.inventory_file, self.todos_file] + sources)
+
+    def _apply(self, hosts: Iterable, indices: Optional[Set[int]]) -> None:
+        """
+        Run the given tasks on the given hosts through the warm connection pool.
+
+        :param hosts: The hosts to run the tasks on.
+        :type hosts: Iterable[Host]
+        :param indices: The 1-based indices of the tasks to run, or None for every task.
+        :type indices: set, optional
+        """
+        runner = Runner(self.inventory, self.todos, self.dry_run, bundled=self.bundled, pool=self.pool)
+        try:
+            runner.run(hosts=hosts, indices=indices)
+        except Exception as e:
+            logger.error(f"Error while applying tasks: {e}")
@@ -1,8 +1,10 @@
 import yaml
 import click
 from typing import Any, Dict
+from mylittleansible.core.inventory import Inventory
 from mylittleansible.core.logger import get_logger
-from mylittleansible.core.runner import Runner
+from mylittleansible.core.play import parse_play, run_play
+from mylittleansible.core.watcher import Watcher
 
 logger = get_logger(__name__)
 
@@ -47,16 +49,25 @@ def validate_yaml_content(content: Dict[str, Any], content_type: str) -> None:
     if content_type == "inventory" and "hosts" not in content:
         raise ValueError("The inventory content is missing the 'hosts' key.")
     elif content_type == "todos" and not isinstance(content, list):
-        raise ValueError("The todos content should be a list of tasks.")
+        if not isinstance(content, dict) or not isinstance(content.get("tasks"), list):
+            raise ValueError("The todos content should be a list of tasks, or a play with a 'tasks' list.")
 
 
-@click.command()
+@click.group(invoke_without_command=True)
+@click.option("-i", "--inventory", "inventory_file", type=click.Path(exists=True), help="Inventory YAML file.")
+@click.option("-t", "--todos", "todos_file", type=click.Path(exists=True), help="Tasks YAML file.")
+@click.option("--dry-run", is_flag=True, help="Run in dry-run mode (no actual execution).")
+@click.option("--bundle", is_flag=True, help="Ship each host's task list as one payload (one round trip per host).")
 @click.option(
-    "-i", "--inventory", "inventory_file", type=click.Path(exists=True), required=True, help="Inventory YAML file."
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of worker processes the inventory is sharded across.",
 )
-@click.option("-t", "--todos", "todos_file", type=click.Path(exists=True), required=True, help="Tasks YAML file.")
-@click.option("--dry-run", is_flag=True, help="Run in dry-run mode (no actual execution).")
-def main(inventory_file: str, todos_file: str, dry_run: bool) -> None:
+@click.pass_context
+def main(ctx: click.Context, inventory_file: str, todos_file: str, dry_run: bool, bundle: bool, workers: int) -> None:
     """
     Main execution function that parses the inventory and todos YAML files and executes tasks on hosts.
 
@@ -64,17 +75,58 @@ def main(inventory_file: str, todos_file: str, dry_run: bool) -> None:
     :type inventory_file: str
     :param todos_file: Path to the tasks YAML file containing tasks to be executed.
     :type todos_file: str
+    :param bundle: Execute every task of a host through a single remote payload.
+    :type bundle: bool
+    :param workers: Number of worker processes the inventory is sharded across.
+    :type workers: int
     """
-    inventory = load_yaml_file(inventory_file, "inventory")
-    todos = load_yaml_file(todos_file, "todos")
+    if ctx.invoked_subcommand is not None:
+        return
+    if not inventory_file or not todos_file:
+        raise click.UsageError("Both -i / --inventory and -t / --todos are required.")
+
+    inventory = Inventory.from_dict(load_yaml_file(inventory_file, "inventory"))
+    todos, play_options = parse_play(load_yaml_file(todos_file, "todos"))
 
-    hosts = [host_details.get("ssh_address") for host_name, host_details in inventory.get("hosts", {}).items()]
-    logger.info(f"Processing {len(todos)} task(s) on hosts: {hosts}")
+    hosts = inventory.describe()
+    logger.info(f"Processing {len(todos)} task(s) on {hosts}")
 
-    runner = Runner(inventory, todos, dry_run=dry_run)
-    runner.run()
+    report = run_play(inventory, todos, workers=workers, dry_run=dry_run, bundled=bundle, **play_options)
 
-    logger.info(f"processing tasks on hosts: {hosts} -> DONE")
+    logger.info(f"processing tasks on {hosts} -> DONE ({report.summary()})")
+    if report.failed:
+        ctx.exit(2)
+
+
+@main.command()
+@click.option(
+    "-i", "--inventory", "inventory_file", type=click.Path(exists=True), required=True, help="Inventory YAML file."
+)
+@click.option("-t", "--todos", "todos_file", type=click.Path(exists=True), required=True, help="Tasks YAML file.")
+@click.option("--dry-run", is_flag=True, help="Run in dry-run mode (no actual execution).")
+@click.option("--bundle", is_flag=True, help="Ship each host's task list as one payload (one round trip per host).")
+@click.option("--interval", type=float, default=0.5, show_default=True, help="Seconds between two file polls.")
+def watch(inventory_file: str, todos_file: str, dry_run: bool, bundle: bool, interval: float) -> None:
+    """
+    Keep connections warm and re-apply the affected tasks whenever the todos, templates or copy sources change.
+
+    :param inventory_file: Path to the inventory YAML file containing host information.
+    :type inventory_file: str
+    :param todos_file: Path to the tasks YAML file containing tasks to be executed.
+    :type todos_file: str
+    :param interval: Seconds between two polls of the watched files.
+    :type interval: float
+    """
+    watcher = Watcher(
+        inventory_file,
+        todos_file,
+        load_inventory=lambda: Inventory.from_dict(load_yaml_file(inventory_file, "inventory")),
+        load_todos=lambda: parse_play(load_yaml_file(todos_file, "todos"))[0],
+        dry_run=dry_run,
+        bundled=bundle,
+        interval=interval,
+    )
+    watcher.run()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,6 @@
-from mylittleansible.modules.base import BaseModule
+import shlex
+
+from mylittleansible.modules.base import SEPARATOR, BaseModule, run_sudo
 from mylittleansible.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -9,6 +11,31 @@ class AptModule(BaseModule):
     Install and uninstall packages via apt-get on Debian-based systems.
     """
 
+    batchable = True
+
+    @classmethod
+    def batch(cls, modules) -> "AptModule":
+        """
+        Merge the items of an apt loop into one task installing and removing every package at once.
+
+        :param modules: The apt modules to merge, in order.
+        :type modules: list
+        :rtype: AptModule
+        """
+        packages = [package for module in modules for package in module.packages]
+        return cls({"packages": packages}, modules[0].index, modules[0].dry_run)
+
+    @property
+    def packages(self) -> list:
+        """
+        The packages handled by this task, each tagged with the index of its original task.
+
+        :rtype: list
+        """
+        if "packages" in self.params:
+            return self.params["packages"]
+        return [{"index": self.index, "name": self.params.get("name"), "state": self.params.get("state")}]
+
     def process(self, ssh_manager) -> None:
         """
         Execute apt-get install or remove command using an SSH client.
@@ -16,12 +43,16 @@ class AptModule(BaseModule):
         :param ssh_manager: The SSHManager instance to use to execute the action.
         :type ssh_manager: SSHManager
         """
+        if "packages" in self.params:
+            self._process_batch(ssh_manager)
+            return
+
         command_state = None
 
         if self.params.get("state") == "absent":
-            command_state = "sudo apt -y remove"
+            command_state = "apt -y remove"
         else:
-            command_state = "sudo apt -y install"
+            command_state = "apt -y install"
 
         package_name = self.params.get("name")
         full_command = f"{command_state} {package_name}"
@@ -32,15 +63,74 @@ class AptModule(BaseModule):
             )
             return
 
-        stdin, stdout, stderr = ssh_manager.run_command(full_command, pty=True)
-        password = ssh_manager.password
-        stdin.write(f"{password}\n")
-        stdin.flush()
-        exit_status = stdout.channel.recv_exit_status()
+        exit_status, output, errors = run_sudo(ssh_manager, full_command)
 
         if exit_status != 0:
-            logger.error(f"Error while executing command: {stderr}")
+            raise RuntimeError(f"Error while executing command (exit status {exit_status}): {errors[-200:]}")
 
         logger.info(
             f"[{self.index}] host={ssh_manager.hostname} op={self.name} name={package_name} state={self.params.get('state')}"
         )
+
+    def _process_batch(self, ssh_manager) -> None:
+        """
+        Install and remove every package with one sudo call, then report the state of each package.
+
+        :param ssh_manager: The SSHManager instance to use to execute the action.
+        :type ssh_manager: SSHManager
+        """
+        packages = self.packages
+
+        if self.dry_run:
+            for package in packages:
+                logger.info(
+                    f"DRY_RUN [{package['index']}] host={ssh_manager.hostname} op={self.name} name={package['name']} state={package['state']}"
+                )
+            return
+
+        install = [shlex.quote(str(package["name"])) for package in packages if package["state"] != "absent"]
+        remove = [shlex.quote(str(package["name"])) for package in packages if package["state"] == "absent"]
+        names = " ".join(shlex.quote(str(package["name"]).split("=")[0]) for package in packages)
+        steps = ["export DEBIAN_FRONTEND=noninteractive"]
+        if install:
+            steps.append(f"apt-get -y install {' '.join(install)}")
+        if remove:
+            steps.append(f"apt-get -y remove {' '.join(remove)}")
+        steps.append(f"echo '{SEPARATOR}'")
+        steps.append(f"dpkg-query -W -f='${{Package}} ${{db:Status-Abbrev}}\\n' {names} 2>/dev/null")
+
+        exit_status, output, errors = run_sudo(ssh_manager, "; ".join(steps))
+
+        if exit_status != 0:
+            logger.error(f"Error while executing command: {errors[-200:]}")
+
+        installed = set()
+        for line in output.partition(SEPARATOR)[2].splitlines():
+            fields = line.split()
+            if len(fields) == 2 and fields[1].startswith("ii"):
+                installed.add(fields[0])
+
+        failed = []
+        for package in packages:
+            ok = (str(package["name"]).split("=")[0] in installed) != (package["state"] == "absent")
+            if not ok:
+                logger.error(
+                    f"[{package['index']}] host={ssh_manager.hostname} op={self.name} name={package['name']} did not reach state={package['state']}"
+                )
+                failed.append(str(package["name"]))
+            logger.info(
+                f"[{package['index']}] host={ssh_manager.hostname} op={self.name} name={package['name']} state={package['state']}"
+            )
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)}/{len(packages)} package(s) did not reach their state: {', '.join(failed)}"
+            )
+
+    def to_task(self) -> dict:
+        """
+        Describe the apt action for the bundled remote executor.
+
+        :return: The task definition.
+        :rtype: dict
+        """
+        return {"module": "apt", "packages": self.packages}
@@ -1,8 +1,75 @@
+import shlex
+from typing import Dict
+
+# Line separating the sections of a script's output.
+SEPARATOR = "--- mla ---"
+# Line prefix reporting the exit status of one step of a script.
+RC_MARKER = "__MLA_RC__"
+
+
+def report_status(n: int) -> str:
+    """
+    Shell snippet printing the exit status of the previous step of a script, to be read by `parse_statuses`.
+
+    :param n: The position of the step in the script.
+    :type n: int
+    :rtype: str
+    """
+    return f"printf '\\n{RC_MARKER} %s %s\\n' {n} $?"
+
+
+def parse_statuses(output: str) -> Dict[int, int]:
+    """
+    Read the exit statuses reported with `report_status` from a script's output.
+
+    :param output: The output of the script.
+    :type output: str
+    :return: The exit status by step position. Steps that did not report are missing.
+    :rtype: dict
+    """
+    statuses = {}
+    for line in output.splitlines():
+        if line.startswith(RC_MARKER):
+            _, n, exit_status = line.split()
+            statuses[int(n)] = int(exit_status)
+    return statuses
+
+
+def run_sudo(ssh_manager, script: str) -> tuple:
+    """
+    Run a shell script as root with `sudo -S`, feeding the password on stdin rather than to a pty.
+
+    Without a pty nothing echoes the password back, so the output is safe to log. The script's own
+    stdin is reset to /dev/null, so a password that sudo did not ask for is never read by a command.
+
+    :param ssh_manager: The SSHManager instance to run the script with.
+    :type ssh_manager: SSHManager
+    :param script: The shell script to run.
+    :type script: str
+    :return: The exit status, stdout and stderr of the script.
+    :rtype: tuple
+    """
+    command = f"sudo -S -p '' sh -c {shlex.quote('exec </dev/null; ' + script)}"
+    stdin, stdout, stderr = ssh_manager.run_command(command)
+    if ssh_manager.password:
+        stdin.write(f"{ssh_manager.password}\n")
+    stdin.flush()
+    stdin.close()
+    output = stdout.read().decode(errors="replace")
+    errors = stderr.read().decode(errors="replace")
+    return stdout.channel.recv_exit_status(), output, errors
+
+
 class BaseModule:
     """
     Base class for all modules.
     """
 
+    # When True, the items of a `loop:` are merged into one task with `batch`.
+    batchable = False
+    # When True, the runner also merges adjacent tasks of this module into one task with `batch`.
+    merge_adjacent = False
+
     def __init__(self, params, index, dry_run=False):
         """
         Initializes the module with the given parameters.
@@ -17,6 +84,18 @@ class BaseModule:
         self.name = self.__class__.__name__.replace("Module", "")
         self.dry_run = dry_run
 
+    @classmethod
+    def batch(cls, modules) -> "BaseModule":
+        """
+        Merge several tasks of this module into a single task applied in one remote operation.
+
+        :param modules: The modules to merge, in order.
+        :type modules: list
+        :return: The merged module, using the index of the first module.
+        :rtype: BaseModule
+        """
+        raise NotImplementedError(f"{cls.__name__} does not support batching.")
+
     def process(self, ssh_manager) -> None:
         """
         Apply the action to `ssh_client` using `params`.
@@ -25,3 +104,12 @@ class BaseModule:
         :type ssh_manager: SSHManager
         """
         raise NotImplementedError("This method must be implemented by the subclass.")
+
+    def to_task(self) -> dict:
+        """
+        Describe the action as a JSON-serialisable task for the bundled remote executor.
+
+        :return: The task definition, with at least a `module` key.
+        :rtype: dict
+        """
+        raise NotImplementedError("This method must be implemented by the subclass.")
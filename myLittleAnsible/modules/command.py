@@ -1,4 +1,4 @@
-from mylittleansible.modules.base import BaseModule
+from mylittleansible.modules.base import BaseModule, parse_statuses, report_status
 from mylittleansible.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -9,6 +9,31 @@ class CommandModule(BaseModule):
     Run any commands based on the todo file definition on the remote host.
     """
 
+    batchable = True
+
+    @classmethod
+    def batch(cls, modules) -> "CommandModule":
+        """
+        Merge the items of a command loop into one task running every command in a single shell.
+
+        :param modules: The command modules to merge, in order.
+        :type modules: list
+        :rtype: CommandModule
+        """
+        commands = [command for module in modules for command in module.commands]
+        return cls({"commands": commands}, modules[0].index, modules[0].dry_run)
+
+    @property
+    def commands(self) -> list:
+        """
+        The commands handled by this task, each tagged with the index of its original task.
+
+        :rtype: list
+        """
+        if "commands" in self.params:
+            return self.params["commands"]
+        return [{"index": self.index, "command": self.params.get("command")}]
+
     def process(self, ssh_manager) -> None:
         """
         Execute a command with ssh client.
@@ -16,6 +41,10 @@ class CommandModule(BaseModule):
         :param ssh_manager: The SSH manager.
         :type ssh_manager: SSHManager
         """
+        if "commands" in self.params:
+            self._process_batch(ssh_manager)
+            return
+
         command_name = self.params.get("command")
 
         if self.dry_run:
@@ -27,6 +56,55 @@ class CommandModule(BaseModule):
         stderr_content = stderr.read()
 
         if exit_status != 0:
-            logger.error(f"Error while executing command: {stderr_content[:200]}")
+            raise RuntimeError(
+                f"Error while executing command (exit status {exit_status}): {stderr_content.decode(errors='replace')[:200]}"
+            )
 
         logger.info(f"[{self.index}] host={ssh_manager.hostname} op={self.name} name={command_name}")
+
+    def _process_batch(self, ssh_manager) -> None:
+        """
+        Run every command in one remote shell, reporting the exit status of each of them.
+
+        :param ssh_manager: The SSH manager.
+        :type ssh_manager: SSHManager
+        """
+        commands = self.commands
+
+        if self.dry_run:
+            for command in commands:
+                logger.info(
+                    f"DRY_RUN [{command['index']}] host={ssh_manager.hostname} op={self.name} name={command['command']}"
+                )
+            return
+
+        script = "\n".join(
+            f"( {command['command']}\n) </dev/null; {report_status(n)}" for n, command in enumerate(commands)
+        )
+        stdin, stdout, stderr = ssh_manager.run_command(script, pty=False)
+        output = stdout.read().decode(errors="replace")
+        stderr_content = stderr.read()
+        stdout.channel.recv_exit_status()
+
+        exit_statuses = parse_statuses(output)
+
+        failed = []
+        for n, command in enumerate(commands):
+            exit_status = exit_statuses.get(n)
+            if exit_status != 0:
+                logger.error(
+                    f"[{command['index']}] host={ssh_manager.hostname} Error while executing command (exit status {exit_status}): {stderr_content.decode(errors='replace')[:200]}"
+                )
+                failed.append(command["command"])
+            logger.info(f"[{command['index']}] host={ssh_manager.hostname} op={self.name} name={command['command']}")
+        if failed:
+            raise RuntimeError(f"{len(failed)}/{len(commands)} command(s) failed: {failed[0]}")
+
+    def to_task(self) -> dict:
+        """
+        Describe the command for the bundled remote executor.
+
+        :return: The task definition.
+        :rtype: dict
+        """
+        return {"module": "command", "commands": self.commands}
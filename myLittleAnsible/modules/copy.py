@@ -1,244 +1,323 @@
+import base64
 import os
-import platform
+import shlex
+import uuid
 from pathlib import Path
 
-from mylittleansible.modules.base import BaseModule
+from mylittleansible.modules.base import BaseModule, parse_statuses, report_status, run_sudo
+from mylittleansible.core.hashindex import HashIndex
 from mylittleansible.core.logger import get_logger
 
 logger = get_logger(__name__)
 
+ITEM_MARKER = "__MLA_ITEM__"
+
 
 class CopyModule(BaseModule):
     """
     Transferring files and directories over SFTP.
     """
 
-    sftp_session = None
+    batchable = True
+    local_digests = None
+    item_modules = None
+
+    @classmethod
+    def batch(cls, modules) -> "CopyModule":
+        """
+        Merge the items of a copy loop into one task sharing one SFTP session and one checksum call.
+
+        :param modules: The copy modules to merge, in order.
+        :type modules: list
+        :rtype: CopyModule
+        """
+        items = [item for module in modules for item in module.items]
+        return cls({"items": items}, modules[0].index, modules[0].dry_run)
+
+    @property
+    def items(self) -> list:
+        """
+        The copies handled by this task, each tagged with the index of its original task.
+
+        :rtype: list
+        """
+        if "items" in self.params:
+            return self.params["items"]
+        return [dict(self.params, index=self.index)]
 
     def process(self, ssh_manager) -> None:
         """
         Execute the file or directory copy command using an SSH client.
 
+        Whatever the number of items, the copy takes one remote `sha256sum` call to find the changed
+        files, one SFTP session uploading them to a private staging directory, and one sudo script
+        making the backups and moving the staged files into place.
+
         :param ssh_manager: The SSH manager.
         :type ssh_manager: SSHManager
         """
-        try:
-            source_path = self.params.get("src")
-            destination_path = self.params.get("dest")
-            make_backup = self.params.get("backup")
-            self.sftp_session = ssh_manager.client.open_sftp()
+        items = self._get_item_modules()
 
-            if self.dry_run:
+        if self.dry_run:
+            for item in items:
                 logger.info(
-                    f"DRY_RUN [{self.index}] host={ssh_manager.hostname} op={self.name} src={source_path} dest={destination_path} backup={make_backup}"
-                )
-                return
-
-            if os.path.isfile(source_path):
-                logger.debug(
-                    f"[{self.index}] host={ssh_manager.hostname} Copying file: {source_path} to {destination_path}"
+                    f"DRY_RUN [{item.index}] host={ssh_manager.hostname} op={self.name} src={item.params.get('src')} dest={item.params.get('dest')} backup={item.params.get('backup')}"
                 )
-
-                if make_backup is True:
-                    self._backup_file(ssh_manager)
-                if self._is_needed_permissions(ssh_manager):
-                    self._change_destination_permissions(ssh_manager, "777")
-                    self._copy_file_to_remote(ssh_manager, source_path, destination_path)
-                    self._change_destination_permissions(ssh_manager, "755")
-                    logger.info(
-                        f"[{self.index}] host={ssh_manager.hostname} op={self.name} src={source_path} dest={destination_path} backup={make_backup}"
-                    )
-                    return
-                self._copy_file_to_remote(ssh_manager, source_path, destination_path)
+            return
+
+        failed = []
+        commands = []
+        for n, item in enumerate(items):
+            try:
+                command = item._digest_command()
+            except FileNotFoundError:
+                logger.error(f"[{item.index}] host={ssh_manager.hostname} The local file was not found.")
+                failed.append(item)
+                continue
+            commands.append(f"echo '{ITEM_MARKER} {n}'; ( {command} )")
+        outputs = {}
+        if commands:
+            stdin, stdout, stderr = ssh_manager.run_command("; ".join(commands))
+            for line in stdout.read().decode(errors="replace").splitlines():
+                if line.startswith(ITEM_MARKER):
+                    current = outputs.setdefault(int(line.split()[1]), [])
+                elif outputs:
+                    current.append(line)
+
+        changes = []
+        for n, item in enumerate(items):
+            if item in failed:
+                continue
+            changed_files = item._compare_digests(outputs.get(n, []))
+            if changed_files and item.params.get("backup") is True and os.path.isdir(item.params.get("src")):
+                # The whole destination directory is moved to the backup, so every file is needed.
+                changed_files = set(item._get_local_digests())
+            changes.append((item, changed_files))
+
+        to_install = [(item, changed_files) for item, changed_files in changes if changed_files]
+        if to_install:
+            failed.extend(self._install(ssh_manager, to_install))
+
+        for item, changed_files in changes:
+            if item not in failed:
                 logger.info(
-                    f"[{self.index}] host={ssh_manager.hostname} op={self.name} src={source_path} dest={destination_path} backup={make_backup}"
-                )
-            elif os.path.isdir(source_path):
-                logger.debug(
-                    f"[{self.index}] host={ssh_manager.hostname} Transferring directory: {source_path} to {destination_path}"
+                    f"[{item.index}] host={ssh_manager.hostname} op={self.name} src={item.params.get('src')} dest={item.params.get('dest')} backup={item.params.get('backup')} changed={bool(changed_files)}"
                 )
-                if make_backup is True:
-                    self._backup_directory(ssh_manager)
-                if self._is_needed_permissions(ssh_manager):
-                    self._change_destination_permissions(ssh_manager, "777")
-                    self._copy_directory_to_remote(source_path, destination_path)
-                    self._change_destination_permissions(ssh_manager, "755")
-                    logger.info(
-                        f"[{self.index}] host={ssh_manager.hostname} op={self.name} src={source_path} dest={destination_path} backup={make_backup}"
-                    )
-                    return
-                self._copy_directory_to_remote(source_path, destination_path)
-            else:
-                logger.error("The specified path does not exists.")
-            logger.info(
-                f"[{self.index}] host={ssh_manager.hostname} op={self.name} src={source_path} dest={destination_path} backup={make_backup}"
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)}/{len(items)} copy item(s) failed: {', '.join(str(item.params.get('src')) for item in failed)}"
             )
 
-        except FileNotFoundError:
-            logger.error(f"[{self.index}] host={ssh_manager.hostname} The local file was not found.")
-        except Exception as e:
-            logger.error(f"[{self.index}] host={ssh_manager.hostname} Unexpected error: {str(e)}")
-        finally:
-            if self.sftp_session:
-                self.sftp_session.close()
-
-    def _copy_file_to_remote(self, ssh_manager, local_filepath, remote_filepath) -> None:
+    def _install(self, ssh_manager, to_install) -> list:
         """
-        Copy a single file to a remote location.
+        Upload the changed files to a staging directory, then apply every item with one sudo script.
 
         :param ssh_manager: The SSH manager.
         :type ssh_manager: SSHManager
-        :param local_filepath: The local file path.
-        :type local_filepath: str
-        :param remote_filepath: The remote file path.
-        :type remote_filepath: str
+        :param to_install: The items to apply, with the relative paths of their changed files.
+        :type to_install: list
+        :return: The items that could not be applied.
+        :rtype: list
         """
+        staging = f"/tmp/.mla-copy-{uuid.uuid4().hex}"
+        sftp_session = ssh_manager.open_sftp()
         try:
-            full_remote_path = os.path.join(remote_filepath, os.path.basename(local_filepath)).replace("\\", "/")
-            self.sftp_session.put(local_filepath, full_remote_path)
-            logger.debug(f"[{self.index}] host={ssh_manager.hostname} File copy success")
-        except FileNotFoundError:
-            logger.error("The local file was not found.")
-        except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
-
-    def _ensure_remote_directory(self, remote_directory):
-        """
-        Ensure that the remote directory exists, creating it if necessary.
-        """
-        try:
-            self.sftp_session.chdir(remote_directory)
-        except IOError:
-            logger.debug(f"Creating remote directory: {remote_directory}")
-            self.sftp_session.mkdir(remote_directory)
-            self.sftp_session.chdir(remote_directory)
+            sftp_session.mkdir(staging, 0o700)
+            for n, (item, changed_files) in enumerate(to_install):
+                item._stage(ssh_manager, sftp_session, f"{staging}/{n}", changed_files)
+        except Exception:
+            ssh_manager.run_command(f"rm -rf {staging}")[1].channel.recv_exit_status()
+            raise
+        finally:
+            sftp_session.close()
+
+        script = "\n".join(
+            f"( {' && '.join(item._install_steps(f'{staging}/{n}'))} ); {report_status(n)}"
+            for n, (item, changed_files) in enumerate(to_install)
+        )
+        script += f"\nrm -rf {staging}"
+        exit_status, output, errors = run_sudo(ssh_manager, script)
+
+        exit_statuses = parse_statuses(output)
+
+        failed = []
+        for n, (item, changed_files) in enumerate(to_install):
+            exit_status = exit_statuses.get(n)
+            if exit_status != 0:
+                logger.error(
+                    f"[{item.index}] host={ssh_manager.hostname} Error while installing {item.params.get('dest')} (exit status {exit_status}): {errors[-200:]}"
+                )
+                failed.append(item)
+        return failed
 
-    def _copy_directory_to_remote(self, local_directory, remote_directory) -> None:
+    def _get_item_modules(self) -> list:
         """
-        Recursively transfer a directory to a remote location.
+        Get one CopyModule per loop item, built once so that local digests are shared by every host.
 
-        :param local_directory: The local directory path.
-        :type local_directory: str
-        :param remote_directory: The remote directory path.
-        :type remote_directory: str
+        :rtype: list
         """
-        self._ensure_remote_directory(remote_directory)
-
-        for item in Path(local_directory).rglob("*"):
-            local_path = str(item)
-            if platform.system() == "Windows":
-                local_path = local_path.replace("\\", "/")
-
-            relative_path = item.relative_to(Path(local_directory))
-            if platform.system() == "Windows":
-                relative_path = str(relative_path).replace("\\", "/")
-
-            remote_path = os.path.join(remote_directory, str(relative_path))
-            if platform.system() == "Windows":
-                remote_path = remote_path.replace("\\", "/")
-
-            if item.is_dir():
-                logger.debug(f"Creating remote directory: {remote_path}")
-                self._ensure_remote_directory(remote_path)
-            else:
-                logger.debug(f"Copying file: {local_path} to {remote_path}")
-                self.sftp_session.put(local_path, remote_path)
-
-    def _is_needed_permissions(self, ssh_manager) -> bool:
+        if self.item_modules is None:
+            self.item_modules = [
+                CopyModule({key: value for key, value in item.items() if key != "index"}, item["index"], self.dry_run)
+                for item in self.items
+            ]
+        return self.item_modules
+
+    def _stage(self, ssh_manager, sftp_session, staging, changed_files) -> None:
         """
-        Check the permissions of the destination_path file or directory.
+        Upload the changed files of the source to a staging directory on the remote host.
 
         :param ssh_manager: The SSH manager.
         :type ssh_manager: SSHManager
-        :return: True if the permissions are not 755, False otherwise.
-        :rtype: bool
+        :param sftp_session: The SFTP session to upload with.
+        :param staging: The remote staging directory of this item.
+        :type staging: str
+        :param changed_files: The relative paths of the files to upload.
+        :type changed_files: set
         """
-        dest = self.params.get("dest")
-        stat_command = f"stat -c '%a %n' {dest}"
-        stdin, stdout, stderr = ssh_manager.run_command(stat_command, pty=True)
-        output = stdout.read().decode().strip()
-        return True if "755" in output else False
+        source_path = self.params.get("src")
+        sftp_session.mkdir(staging)
+        if os.path.isfile(source_path):
+            logger.debug(f"[{self.index}] host={ssh_manager.hostname} Copying file: {source_path}")
+            sftp_session.put(source_path, f"{staging}/{os.path.basename(source_path)}")
+            return
+
+        logger.debug(f"[{self.index}] host={ssh_manager.hostname} Transferring directory: {source_path}")
+        for item in sorted(Path(source_path).rglob("*")):
+            relative_path = item.relative_to(Path(source_path)).as_posix()
+            if item.is_dir():
+                sftp_session.mkdir(f"{staging}/{relative_path}")
+            elif relative_path in changed_files:
+                logger.debug(f"Copying file: {item} to {self.params.get('dest')}/{relative_path}")
+                sftp_session.put(str(item), f"{staging}/{relative_path}")
 
-    def _change_destination_permissions(self, ssh_manager, permissions_code) -> None:
+    def _install_steps(self, staging) -> list:
         """
-        Change the permissions of the destination_path file or directory.
+        Build the shell steps making the backup and moving the staged files to the destination.
 
-        :param ssh_manager: The SSH manager.
-        :type ssh_manager: SSHManager
-        :param permissions_code: The permissions code.
-        :type permissions_code: str
+        :param staging: The remote staging directory of this item.
+        :type staging: str
+        :rtype: list
         """
-        dest = self.params.get("dest")
-        chmod_command = f"sudo chmod {permissions_code} {dest}"
-        stdin, stdout, stderr = ssh_manager.run_command(chmod_command, pty=True)
-        password = ssh_manager.password
-        stdin.write(f"{password}\n")
-        stdin.flush()
-        exit_status = stdout.channel.recv_exit_status()
-        if exit_status != 0:
-            logger.error(f"Error while executing command: {stderr[:200]}")
-        logger.debug(f"[{self.index}] host={ssh_manager.hostname} dest={dest} permission_code={permissions_code}")
+        source_path = self.params.get("src")
+        destination_path = self.params.get("dest")
+        backup_directory = shlex.quote(f"/tmp{destination_path}")
+        dest = shlex.quote(destination_path)
+
+        if os.path.isfile(source_path):
+            file_name = os.path.basename(source_path)
+            full_path = os.path.join(destination_path, file_name)
+            target = shlex.quote(full_path)
+            steps = [f"mkdir -p {dest}"]
+            if self.params.get("backup") is True:
+                steps.append(
+                    f"{{ ! [ -f {target} ] || {{ mkdir -p {backup_directory} && mv {target} {shlex.quote(f'/tmp{full_path}.backup')}; }}; }}"
+                )
+            steps.append(f"cp -p {shlex.quote(f'{staging}/{file_name}')} {target}")
+            return steps
 
-    def _backup_file(self, ssh_manager) -> None:
-        """
-        Make a make_backup of the destination_path file.
+        steps = []
+        if self.params.get("backup") is True:
+            steps.append(
+                f"{{ ! [ -d {dest} ] || {{ mkdir -p {backup_directory} && mv {dest} {shlex.quote(f'/tmp{destination_path}.backup')}; }}; }}"
+            )
+        steps.append(f"mkdir -p {dest}")
+        steps.append(f"cp -pR {shlex.quote(staging)}/. {dest}/")
+        return steps
 
-        :param ssh_manager: The SSH manager.
-        :type ssh_manager: SSHManager
+    def _get_local_digests(self) -> dict:
         """
-        source_path = self.params.get("src")
-        destination_path = self.params.get("dest")
-        file_name = os.path.basename(source_path)
-        full_path = os.path.join(destination_path, file_name).replace("\\", "/")
-        if self._check_remote_file_exists(ssh_manager, full_path):
-            move_command = f"mkdir -p /tmp{destination_path} && sudo mv {destination_path}{file_name} /tmp{destination_path}{file_name}.backup"
-            stdin, stdout, stderr = ssh_manager.run_command(move_command, pty=True)
-            stdin.write(f"{ssh_manager.password}\n")
-            stdin.flush()
-            if stdout.channel.recv_exit_status() != 0:
-                logger.error(f"Error while executing command: {stderr[:200]}")
-        logger.debug(f"[{self.index}] host={ssh_manager.hostname} Backup done in /tmp/...")
+        Get the content digests of the source files, computed once and shared by every host.
+
+        Digests come from the persistent hash index, so only new or modified files are rehashed.
 
-    def _check_remote_file_exists(self, ssh_manager, file_path) -> bool:
+        :return: The sha256 digest by path relative to the destination.
+        :rtype: dict
+        """
+        if self.local_digests is None:
+            source_path = self.params.get("src")
+            if not os.path.exists(source_path):
+                raise FileNotFoundError(source_path)
+            if os.path.isfile(source_path):
+                files = {os.path.basename(source_path): source_path}
+            else:
+                files = {
+                    item.relative_to(Path(source_path)).as_posix(): str(item)
+                    for item in Path(source_path).rglob("*")
+                    if item.is_file()
+                }
+            with HashIndex() as index:
+                digests = index.digests(files.values())
+            self.local_digests = {relative_path: digests[path] for relative_path, path in files.items()}
+        return self.local_digests
+
+    def _digest_command(self) -> str:
         """
-        Check if a file exists on the remote server.
+        Build the remote command printing the `sha256sum` of the destination files.
 
-        :param ssh_manager: The SSH manager.
-        :type ssh_manager: SSHManager
-        :param file_path: The file path.
-        :type file_path: str
+        :rtype: str
         """
-        command = f"test -f {file_path} && echo 'Exists' || echo 'Not exists'"
-        stdin, stdout, stderr = ssh_manager.run_command(command)
-        result = stdout.read().decode().strip()
-        return result == "Exists"
+        local_digests = self._get_local_digests()
+        dest = shlex.quote(self.params.get("dest"))
+        if os.path.isfile(self.params.get("src")):
+            names = " ".join(shlex.quote(name) for name in local_digests)
+            return f"cd {dest} && sha256sum -- {names} 2>/dev/null"
+        return f"cd {dest} && find . -type f -exec sha256sum {{}} + 2>/dev/null"
+
+    def _compare_digests(self, lines) -> set:
+        """
+        Compare the local digests with the `sha256sum` output of the destination.
 
-    def _backup_directory(self, ssh_manager) -> None:
+        :param lines: The output lines of the command built by `_digest_command`.
+        :type lines: list
+        :return: The relative paths of the files missing or different on the remote host.
+        :rtype: set
         """
-        Make a backup of the destination_path directory.
+        remote_digests = {}
+        for line in lines:
+            digest, _, path = line.partition("  ")
+            remote_digests[path[2:] if path.startswith("./") else path] = digest
+        return {path for path, digest in self._get_local_digests().items() if remote_digests.get(path) != digest}
 
-        :param ssh_manager: The SSH manager.
-        :type ssh_manager: SSHManager
+    def to_task(self) -> dict:
         """
-        destination_path = self.params.get("dest")
-        backup_path = f"/tmp{destination_path}"
-        move_command = f"mkdir -p {backup_path} && mv {destination_path} {backup_path}.backup"
-        stdin, stdout, stderr = ssh_manager.run_command(move_command)
-        if stdout.channel.recv_exit_status() != 0:
-            logger.error(f"Error while executing command: {stderr.read().decode()}")
-        logger.debug(f"[{self.index}] host={ssh_manager.hostname} Directory backup done in /tmp/...")
+        Describe the copy for the bundled remote executor, embedding the local file contents.
 
-    def _check_remote_directory_exists(self, ssh_manager, directory_path) -> bool:
+        :return: The task definition.
+        :rtype: dict
         """
-        Check if a directory exists on the remote server.
+        if "items" in self.params:
+            return {
+                "module": "copy",
+                "items": [dict(item.to_task(), index=item.index) for item in self._get_item_modules()],
+            }
 
-        :param ssh_manager: The SSH manager.
-        :type ssh_manager: SSHManager
-        :param directory_path: The directory path.
-        :type directory_path: str
-        :rtype: bool
-        """
-        command = f"test -d {directory_path} && echo 'Exists' || echo 'Not exists'"
-        stdin, stdout, stderr = ssh_manager.run_command(command)
-        result = stdout.read().decode().strip()
-        return result == "Exists"
+        source_path = self.params.get("src")
+        if os.path.isfile(source_path):
+            kind = "file"
+            items = [(Path(source_path), os.path.basename(source_path))]
+        elif os.path.isdir(source_path):
+            kind = "directory"
+            items = [
+                (item, item.relative_to(Path(source_path)).as_posix())
+                for item in Path(source_path).rglob("*")
+                if item.is_file()
+            ]
+        else:
+            raise FileNotFoundError(source_path)
+
+        files = [
+            {
+                "path": relative_path,
+                "data": base64.b64encode(item.read_bytes()).decode("ascii"),
+                "mode": item.stat().st_mode & 0o777,
+            }
+            for item, relative_path in items
+        ]
+        return {
+            "module": "copy",
+            "kind": kind,
+            "dest": self.params.get("dest"),
+            "backup": self.params.get("backup") is True,
+            "files": files,
+        }
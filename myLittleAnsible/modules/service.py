@@ -1,4 +1,4 @@
-from mylittleansible.modules.base import BaseModule
+from mylittleansible.modules.base import BaseModule, run_sudo
 
 from mylittleansible.core.logger import get_logger
 
@@ -23,23 +23,28 @@ class ServiceModule(BaseModule):
         full_command = None
 
         if state == "start":
-            full_command = f"sudo service {name} {state} start"
+            full_command = f"service {name} {state} start"
         elif state == "stop":
-            full_command = f"sudo service {name} {state} stop"
+            full_command = f"service {name} {state} stop"
         elif state == "restart":
-            full_command = f"sudo service {name} {state} restart"
+            full_command = f"service {name} {state} restart"
 
         if self.dry_run:
             logger.info(f"DRY_RUN [{self.index}] host={ssh_manager.hostname} op={self.name} name={name} state={state}")
             return
 
-        stdin, stdout, stderr = ssh_manager.run_command(full_command, pty=True)
-        password = ssh_manager.password
-        stdin.write(f"{password}\n")
-        stdin.flush()
-        exit_status = stdout.channel.recv_exit_status()
+        exit_status, output, errors = run_sudo(ssh_manager, full_command)
 
         if exit_status != 0:
-            logger.error(f"Error while executing command: {stderr}")
+            raise RuntimeError(f"Error while executing command (exit status {exit_status}): {errors[:200]}")
 
         logger.info(f"[{self.index}] host={ssh_manager.hostname} op={self.name} name={name} state={state}")
+
+    def to_task(self) -> dict:
+        """
+        Describe the service action for the bundled remote executor.
+
+        :return: The task definition.
+        :rtype: dict
+        """
+        return {"module": "service", "name": self.params.get("name"), "state": self.params.get("state")}
@@ -1,60 +1,132 @@
-from mylittleansible.modules.base import BaseModule
+import base64
+import shlex
+
+from mylittleansible.modules.base import SEPARATOR, BaseModule, run_sudo
+from mylittleansible.core.executor import normalize_value, parse_sysctl_output, render_dropin
 from mylittleansible.core.logger import get_logger
 
 
 logger = get_logger(__name__)
 
+DROPIN_PATH = "/etc/sysctl.d/90-mylittleansible.conf"
+DROPIN_HEADER = "# Managed by mylittleansible, local changes to managed keys are overwritten."
+
+
+def is_true(value) -> bool:
+    """
+    Interpret a YAML flag, which may have been parsed as a boolean or kept as a string.
+
+    :param value: The flag value.
+    :rtype: bool
+    """
+    return value is True or str(value).strip().lower() in ("true", "yes", "on", "1")
+
 
 class SysctlModule(BaseModule):
     """
-    Run sysctl commands on the remote host.
+    Set kernel parameters on the remote host.
+
+    Adjacent sysctl tasks are merged into one task: the current values are read with a single
+    `sysctl` call, permanent keys are written to a managed drop-in under /etc/sysctl.d/ applied with
+    one `sysctl --load`, and only the keys that differ are set at runtime.
     """
 
-    def process(self, ssh_manager) -> None:
+    batchable = True
+    merge_adjacent = True
+
+    @classmethod
+    def batch(cls, modules) -> "SysctlModule":
         """
-        Execute a sysctl command with ssh client.
+        Merge adjacent sysctl tasks into one task.
 
-        :param ssh_manager: The SSH manager.
-        :type ssh_manager: SSHManager
+        :param modules: The sysctl modules to merge, in order.
+        :type modules: list
+        :rtype: SysctlModule
         """
-        full_command = ""
+        entries = [entry for module in modules for entry in module.entries]
+        return cls({"entries": entries}, modules[0].index, modules[0].dry_run)
 
-        attribute = self.params.get("attribute")
-        permanent = self.params.get("permanent")
-        value = self.params.get("value")
+    @property
+    def entries(self) -> list:
+        """
+        The sysctl entries handled by this task, each tagged with the index of its original task.
 
-        full_command = f"sudo sysctl -w {attribute}={value}"
+        :rtype: list
+        """
+        if "entries" in self.params:
+            return self.params["entries"]
+        return [
+            {
+                "index": self.index,
+                "attribute": self.params.get("attribute"),
+                "value": self.params.get("value"),
+                "permanent": is_true(self.params.get("permanent")),
+            }
+        ]
 
-        if self.dry_run:
-            logger.info(
-                f"DRY_RUN [{self.index}] host={ssh_manager.hostname} op={self.name} attribute={attribute} value={value} permanent={permanent}"
-            )
-            return
+    def process(self, ssh_manager) -> None:
+        """
+        Apply the sysctl entries with ssh client.
 
-        try:
-            stdin, stdout, stderr = ssh_manager.run_command(full_command, pty=True)
-        except Exception as e:
-            logger.error(f"Error while executing command: {e}")
-            return
+        :param ssh_manager: The SSH manager.
+        :type ssh_manager: SSHManager
+        """
+        entries = self.entries
 
-        if self.params.get("permanent") == "true":
-            if self.dry_run:
+        if self.dry_run:
+            for entry in entries:
                 logger.info(
-                    f"DRY_RUN [{self.index}] host={ssh_manager.hostname} op={self.name} attribute={attribute} value={value} permanent={permanent}"
+                    f"DRY_RUN [{entry['index']}] host={ssh_manager.hostname} op={self.name} attribute={entry['attribute']} value={entry['value']} permanent={entry['permanent']}"
                 )
-                return
+            return
+
+        keys = " ".join(shlex.quote(entry["attribute"]) for entry in entries)
+        read_command = f"sysctl -e {keys}; echo '{SEPARATOR}'; cat {DROPIN_PATH} 2>/dev/null"
+        stdin, stdout, stderr = ssh_manager.run_command(read_command)
+        output = stdout.read().decode()
+
+        current_output, _, dropin_content = output.partition(f"{SEPARATOR}\n")
+        current = parse_sysctl_output(current_output)
+        changed = [entry for entry in entries if current.get(entry["attribute"]) != normalize_value(entry["value"])]
+        permanent = [entry for entry in entries if entry["permanent"]]
+
+        steps = []
+        new_dropin = render_dropin(dropin_content, permanent, DROPIN_HEADER) if permanent else dropin_content
+        if new_dropin != dropin_content or any(entry["permanent"] for entry in changed):
+            encoded = base64.b64encode(new_dropin.encode()).decode()
+            steps.append(
+                f"printf %s {encoded} | base64 -d > {DROPIN_PATH}.tmp && mv {DROPIN_PATH}.tmp {DROPIN_PATH}"
+                f" && sysctl --load {DROPIN_PATH} >/dev/null"
+            )
+        # Loading the drop-in resets every key it lists, including keys this play only sets at runtime.
+        reloaded = parse_sysctl_output(new_dropin) if steps else {}
+        runtime = [
+            entry
+            for entry in entries
+            if not entry["permanent"] and (entry in changed or entry["attribute"] in reloaded)
+        ]
+        if runtime:
+            assignments = " ".join(
+                shlex.quote(f"{entry['attribute']}={normalize_value(entry['value'])}") for entry in runtime
+            )
+            steps.append(f"sysctl -q -w {assignments}")
 
-            stdin, stdout, stderr = ssh_manager.run_command("sudo sysctl -p", pty=True)
+        if steps:
+            exit_status, output, errors = run_sudo(ssh_manager, " && ".join(steps))
 
-        password = ssh_manager.password
-        stdin.write(f"{password}\n")
-        stdin.flush()
+            if exit_status != 0:
+                raise RuntimeError(f"Error while executing command (exit status {exit_status}): {errors[:200]}")
 
-        exit_status = stdout.channel.recv_exit_status()
+        for entry in entries:
+            logger.info(
+                f"[{entry['index']}] host={ssh_manager.hostname} op={self.name} attribute={entry['attribute']} value={entry['value']} permanent={entry['permanent']} changed={entry in changed}"
+            )
 
-        if exit_status != 0:
-            logger.error(f"Error while executing command: {stderr}")
+    def to_task(self) -> dict:
+        """
+        Describe the sysctl entries for the bundled remote executor.
 
-        logger.info(
-            f"[{self.index}] host={ssh_manager.hostname} op={self.name} attribute={attribute} value={value} permanent={permanent}"
-        )
+        :return: The task definition.
+        :rtype: dict
+        """
+        return {"module": "sysctl", "file": DROPIN_PATH, "header": DROPIN_HEADER, "entries": self.entries}
@@ -1,24 +1,32 @@
-import os
-from pathlib import Path
+import base64
+import hashlib
+import shlex
+import uuid
+from typing import Iterator
 
 from jinja2 import Environment, FileSystemLoader
 
-from mylittleansible.modules.base import BaseModule
+from mylittleansible.modules.base import BaseModule, run_sudo
 from mylittleansible.core.logger import get_logger
 
 logger = get_logger(__name__)
 
+CHUNK_SIZE = 32768
+UNCHANGED = "__MLA_UNCHANGED__"
+UPLOAD_ERROR = "__MLA_UPLOAD_ERROR__"
+
 
 class TemplateModule(BaseModule):
     """
     Template module.
     """
 
-    sftp_session = None
-
     def process(self, ssh_manager) -> None:
         """
-        Execute the file command using an SSH client.
+        Stream the rendered template to the host and install it if its content changed.
+
+        The output is rendered chunk by chunk and written to a temporary remote file while its
+        checksum is computed, so the controller never holds the whole rendered file in memory.
 
         :param ssh_manager: The SSH manager.
         :type ssh_manager: SSHManager
@@ -27,93 +35,118 @@ class TemplateModule(BaseModule):
         destination = self.params.get("dest")
         variables = self.params.get("vars")
 
-        self.render_template(source, variables)
-        self.sftp_session = ssh_manager.client.open_sftp()
-
         if self.dry_run:
             logger.info(f"DRY_RUN [{self.index}] host={ssh_manager.hostname} src={source} dest={destination}")
             return
 
-        if self._is_needed_permissions(ssh_manager):
-            self._change_destination_permissions(ssh_manager, "777")
-            self._copy_file_to_remote("./default", destination)
-            self._change_destination_permissions(ssh_manager, "644")
-            os.remove("./default")
-            logger.info(f"[{self.index}] host={ssh_manager.hostname} op={self.name} src={source} dest={destination}")
-            return
-        self._copy_file_to_remote("./default", destination)
-        os.remove("./default")
-        logger.info(f"[{self.index}] host={ssh_manager.hostname} op={self.name} src={source} dest={destination}")
-
-    def _copy_file_to_remote(self, local_filepath, remote_filepath) -> None:
+        temporary = f"/tmp/.mla-template-{uuid.uuid4().hex}"
+        digest = hashlib.sha256()
+        size = 0
+        sftp_session = ssh_manager.open_sftp()
+        try:
+            with sftp_session.open(temporary, "wb") as remote_file:
+                # The rendered file may hold secrets: keep it private until it is installed.
+                remote_file.chmod(0o600)
+                # Do not wait for the acknowledgement of each chunk before sending the next one.
+                remote_file.set_pipelined(True)
+                for chunk in self._render_chunks(source, variables):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    remote_file.write(chunk)
+        except Exception:
+            try:
+                sftp_session.remove(temporary)
+            except IOError:
+                pass
+            raise
+        finally:
+            sftp_session.close()
+        logger.debug(f"[{self.index}] host={ssh_manager.hostname} streamed {size} bytes sha256={digest.hexdigest()}")
+
+        changed = self._install(ssh_manager, temporary, destination, digest.hexdigest())
+        logger.info(
+            f"[{self.index}] host={ssh_manager.hostname} op={self.name} src={source} dest={destination} changed={changed}"
+        )
+
+    def _install(self, ssh_manager, temporary, destination, digest) -> bool:
         """
-        Copy a single file to a remote location.
-
-        :param local_filepath: The local file path.
-        :type local_filepath: str
-        :param remote_filepath: The remote file path.
-        :type remote_filepath: str
-        """
-        if not os.path.exists(local_filepath):
-            logger.error(f"Local file not found: {local_filepath}")
-            return
-        self.sftp_session.put(local_filepath, remote_filepath)
-
-    def _is_needed_permissions(self, ssh_manager) -> bool:
-        """
-        Check the permissions of the destination_path file or directory.
+        Verify the uploaded file and move it over the destination, unless the destination already has that content.
 
         :param ssh_manager: The SSH manager.
         :type ssh_manager: SSHManager
+        :param temporary: The remote path the rendered template was uploaded to.
+        :type temporary: str
+        :param destination: The remote destination path.
+        :type destination: str
+        :param digest: The sha256 of the rendered template.
+        :type digest: str
+        :raises RuntimeError: If the upload is corrupted or the file cannot be installed.
+        :return: Whether the destination was modified.
         :rtype: bool
         """
-        dest = self.params.get("dest")
-
-        stat_command = f"stat -c '%a %n' {dest}"
-        stdin, stdout, stderr = ssh_manager.run_command(stat_command, pty=True)
-        output = stdout.read().decode().strip()
+        tmp, dest = shlex.quote(temporary), shlex.quote(destination)
+        script = (
+            f"echo {digest}' '' '{tmp} | sha256sum -c --status || {{ rm -f {tmp}; echo {UPLOAD_ERROR}; exit 1; }}; "
+            f"if echo {digest}' '' '{dest} | sha256sum -c --status 2>/dev/null; then rm -f {tmp}; echo {UNCHANGED}; "
+            f"else install -m 644 {tmp} {dest}; rc=$?; rm -f {tmp}; exit $rc; fi"
+        )
+        exit_status, output, errors = run_sudo(ssh_manager, script)
 
-        if "755" in output:
-            return True
-        if "644" in output:
-            return True
-        else:
-            return False
+        if exit_status != 0:
+            if UPLOAD_ERROR in output:
+                raise RuntimeError(f"Checksum mismatch after uploading {destination}")
+            raise RuntimeError(f"Error while installing {destination}: {errors[:200]}")
+        return UNCHANGED not in output
 
-    def _change_destination_permissions(self, ssh_manager, permissions_code) -> None:
+    def _render_chunks(self, template_path, variables) -> Iterator[bytes]:
         """
-        Change the permissions of the destination_path file or directory.
+        Render a Jinja2 template as a stream of UTF-8 chunks of about CHUNK_SIZE bytes.
 
-        :param ssh_manager: The SSH manager.
-        :type ssh_manager: SSHManager
-        :param permissions_code: The permissions code.
-        :type permissions_code: str
+        :param template_path: The path to the template file.
+        :type template_path: str
+        :param variables: The variables to render the template with.
+        :type variables: dict
+        :rtype: Iterator[bytes]
         """
-        dest = self.params.get("dest")
-
-        chmod_command = f"sudo chmod {permissions_code} {dest}"
-        stdin, stdout, stderr = ssh_manager.run_command(chmod_command, pty=True)
-        password = ssh_manager.password
-        stdin.write(f"{password}\n")
-        stdin.flush()
-
-        exit_status = stdout.channel.recv_exit_status()
-
-        if exit_status != 0:
-            logger.error(f"Error while executing command: {stderr[:200]}")
-
-    def render_template(self, template_path, variables) -> None:
+        env = Environment(loader=FileSystemLoader("."))
+        template = env.get_template(template_path)
+        # generate() yields the template output in small fragments, grouped here into SFTP sized writes.
+        buffer, buffered = [], 0
+        for fragment in template.generate(variables or {}):
+            buffer.append(fragment)
+            buffered += len(fragment)
+            if buffered >= CHUNK_SIZE:
+                yield "".join(buffer).encode("utf-8")
+                buffer, buffered = [], 0
+        if buffer:
+            yield "".join(buffer).encode("utf-8")
+
+    def _render(self, template_path, variables) -> str:
         """
-        Render a Jinja2 template and write it to a file.
+        Render a Jinja2 template to a string.
 
         :param template_path: The path to the template file.
         :type template_path: str
         :param variables: The variables to render the template with.
         :type variables: dict
+        :rtype: str
         """
         env = Environment(loader=FileSystemLoader("."))
         template = env.get_template(template_path)
-        output = template.render(variables)
+        return template.render(variables)
 
-        with open("./default", "w") as f:
-            f.write(output)
+    def to_task(self) -> dict:
+        """
+        Describe the template for the bundled remote executor, embedding the rendered content.
+
+        The bundle is a single payload, so the whole rendered file is held in memory here.
+
+        :return: The task definition.
+        :rtype: dict
+        """
+        output = self._render(self.params.get("src"), self.params.get("vars"))
+        return {
+            "module": "template",
+            "dest": self.params.get("dest"),
+            "data": base64.b64encode(output.encode("utf-8")).decode("ascii"),
+        }
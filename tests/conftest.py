@@ -0,0 +1,56 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent / "myLittleAnsible"
+
+# The code imports `mylittleansible` while the package directory is `myLittleAnsible`, which only
+# resolves by itself on case-insensitive filesystems or once the package is installed.
+try:
+    import mylittleansible  # noqa: F401
+except ImportError:
+    spec = importlib.util.spec_from_file_location(
+        "mylittleansible", PACKAGE_DIR / "__init__.py", submodule_search_locations=[str(PACKAGE_DIR)]
+    )
+    sys.modules["mylittleansible"] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules["mylittleansible"])
+
+from mylittleansible.core.connection import LocalConnection  # noqa: E402
+
+
+class FakeSudoConnection(LocalConnection):
+    """
+    Local connection running `sudo ...` (and `sudo -S -p ''`) commands as the current user, for modules that escalate.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.commands = []
+
+    def run_command(self, command, pty=False) -> tuple:
+        self.commands.append(command)
+        for prefix in ("sudo -S -p '' ", "sudo "):
+            if command.startswith(prefix):
+                command = command[len(prefix) :]
+                break
+        return super().run_command(command, pty)
+
+
+@pytest.fixture
+def local():
+    return LocalConnection()
+
+
+@pytest.fixture
+def fake_sudo():
+    return FakeSudoConnection()
+
+
+@pytest.fixture(autouse=True)
+def hash_index(tmp_path, monkeypatch):
+    """
+    Keep the copy module hash index out of the user cache directory.
+    """
+    monkeypatch.setattr("mylittleansible.core.hashindex.DEFAULT_INDEX_PATH", str(tmp_path / "hashes.sqlite3"))
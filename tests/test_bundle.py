@@ -0,0 +1,71 @@
+from mylittleansible.core.bundle import build_payload, build_tasks, execute_bundle
+from mylittleansible.core.inventory import Inventory
+from mylittleansible.core.runner import Runner
+
+import mylittleansible.core.pool as pool
+from mylittleansible.modules.command import CommandModule
+
+
+def bundled_run(monkeypatch, fake_sudo, todos, names=("a",)):
+    """
+    Run the todos in bundled mode on local hosts, through connections like `fake_sudo` so that `sudo -S -p ''` is skipped.
+
+    :return: The report and the commands run on every host.
+    """
+    commands = []
+
+    class RecordingConnection(type(fake_sudo)):
+        def run_command(self, command, pty=False) -> tuple:
+            commands.append(command)
+            return super().run_command(command, pty)
+
+    monkeypatch.setitem(pool.BACKENDS, "local", RecordingConnection)
+    inventory = Inventory.from_dict({"hosts": {name: {"connection": "local"} for name in names}})
+    return Runner(inventory, todos, dry_run=False, bundled=True).run(), commands
+
+
+def test_bundle_stops_at_the_first_failed_task(monkeypatch, fake_sudo, tmp_path):
+    todos = [
+        {"module": "command", "params": {"command": f"touch {tmp_path}/before"}},
+        {"module": "command", "params": {"command": "false"}},
+        {"module": "command", "params": {"command": f"touch {tmp_path}/after"}},
+    ]
+
+    report, commands = bundled_run(monkeypatch, fake_sudo, todos)
+
+    assert (tmp_path / "before").exists()
+    assert not (tmp_path / "after").exists()
+    assert report.ok == {"a": 1}
+    assert report.failed == {"a": 1}
+
+
+def test_bundle_results_map_back_by_position(fake_sudo):
+    modules = [
+        CommandModule({"command": "echo first"}, 1),
+        CommandModule.batch([CommandModule({"command": "true"}, 2), CommandModule({"command": "exit 3"}, 2)]),
+    ]
+
+    results = execute_bundle(fake_sudo, modules, build_payload(build_tasks(modules)))
+
+    assert [result["index"] for result in results] == [0, 1]
+    assert "first" in results[0]["stdout"]
+    assert [item["rc"] for item in results[1]["items"]] == [0, 3]
+    assert results[1]["rc"] == 3
+
+
+def test_bundled_loop_is_reported_per_item(monkeypatch, fake_sudo, tmp_path, caplog):
+    todos = [
+        {"module": "command", "params": {"command": f"touch {tmp_path}/{{{{ item }}}}"}, "loop": ["x", "y", "z"]},
+        {"module": "command", "params": {"command": f"touch {tmp_path}/last"}},
+    ]
+
+    with caplog.at_level("INFO"):
+        report, commands = bundled_run(monkeypatch, fake_sudo, todos, names=("a", "b"))
+
+    assert report.ok == {"a": 2, "b": 2}
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["last", "x", "y", "z"]
+    assert caplog.text.count("[1] host=localhost op=Command rc=0") == 6
+    assert caplog.text.count("[2] host=localhost op=Command rc=0") == 2
+    # One remote command per host: the bundle.
+    assert len(commands) == 2
+    assert all(command.startswith("sudo -S -p '' python3 -c") for command in commands)
@@ -0,0 +1,89 @@
+import io
+import os
+import threading
+
+from mylittleansible.core.connection import LocalConnection
+
+
+def run_with_timeout(target, timeout=10):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "the command did not return"
+
+
+def test_run_command_returns_output_and_exit_status(local):
+    stdin, stdout, stderr = local.run_command("echo out; echo err >&2; exit 3")
+
+    assert stdout.read() == b"out\n"
+    assert stderr.read() == b"err\n"
+    assert stdout.channel.recv_exit_status() == 3
+
+
+def test_run_command_reads_stdin(local):
+    stdin, stdout, stderr = local.run_command("read line; echo got $line")
+    stdin.write("secret\n")
+    stdin.flush()
+    stdin.close()
+
+    assert stdout.read() == b"got secret\n"
+
+
+def test_exit_status_before_reading_large_output(local):
+    def target():
+        stdin, stdout, stderr = local.run_command("seq 1 100000; seq 1 100000 >&2")
+        assert stdout.channel.recv_exit_status() == 0
+        assert len(stdout.read()) == len(stderr.read()) == 588895
+
+    run_with_timeout(target)
+
+
+def test_pty_large_output(local):
+    def target():
+        stdin, stdout, stderr = local.run_command("head -c 20000 /dev/zero", pty=True)
+        assert stdout.channel.recv_exit_status() == 0
+        assert len(stdout.read()) == 20000
+        assert stderr.read() == b""
+
+    run_with_timeout(target)
+
+
+def test_pty_is_a_terminal(local):
+    stdin, stdout, stderr = local.run_command("test -t 0 && echo tty", pty=True)
+
+    assert stdout.read().strip() == b"tty"
+
+
+def test_put_and_putfo(local, tmp_path):
+    source = tmp_path / "source"
+    source.write_text("content")
+
+    local.put(str(source), str(tmp_path / "put"))
+    local.putfo(io.BytesIO(b"from memory"), str(tmp_path / "putfo"))
+
+    assert (tmp_path / "put").read_text() == "content"
+    assert (tmp_path / "putfo").read_bytes() == b"from memory"
+
+
+def test_sftp_open_chmod_and_chdir(local, tmp_path):
+    sftp = local.open_sftp()
+    sftp.mkdir(str(tmp_path / "dir"))
+    sftp.chdir(str(tmp_path / "dir"))
+    with sftp.open("file", "wb") as f:
+        f.chmod(0o600)
+        f.set_pipelined(True)
+        f.write(b"data")
+    sftp.close()
+
+    assert (tmp_path / "dir" / "file").read_bytes() == b"data"
+    assert os.stat(tmp_path / "dir" / "file").st_mode & 0o777 == 0o600
+
+
+def test_from_host_uses_inventory_record():
+    from mylittleansible.core.inventory import Host
+
+    connection = LocalConnection.from_host(Host("me", "localhost", password="pw", connection="local"))
+
+    assert connection.hostname == "localhost"
+    assert connection.password == "pw"
+    assert connection.is_active()
@@ -0,0 +1,35 @@
+import hashlib
+import os
+
+from mylittleansible.core import hashindex
+from mylittleansible.core.hashindex import HashIndex
+
+
+def test_only_modified_files_are_rehashed(tmp_path, monkeypatch):
+    unchanged, modified = tmp_path / "unchanged", tmp_path / "modified"
+    unchanged.write_text("same")
+    modified.write_text("before")
+    hashed = []
+
+    def spy(path):
+        hashed.append(path)
+        return hash_file(path)
+
+    hash_file = hashindex.hash_file
+    monkeypatch.setattr(hashindex, "hash_file", spy)
+
+    with HashIndex() as index:
+        index.digests([str(unchanged), str(modified)])
+    assert os.path.exists(hashindex.DEFAULT_INDEX_PATH)
+    assert sorted(hashed) == sorted([str(unchanged), str(modified)])
+
+    hashed.clear()
+    modified.write_text("after, and longer")
+    with HashIndex() as index:
+        digests = index.digests([str(unchanged), str(modified)])
+
+    assert hashed == [str(modified)]
+    assert digests == {
+        str(unchanged): hashlib.sha256(b"same").hexdigest(),
+        str(modified): hashlib.sha256(b"after, and longer").hexdigest(),
+    }
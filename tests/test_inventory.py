@@ -0,0 +1,29 @@
+import pytest
+
+from mylittleansible.core.inventory import Inventory
+
+
+def test_from_dict_keeps_order_and_consumes_entries():
+    content = {"hosts": {f"h{i}": {"ssh_address": f"10.0.0.{i}"} for i in range(5)}}
+
+    inventory = Inventory.from_dict(content)
+
+    assert [host.name for host in inventory] == ["h0", "h1", "h2", "h3", "h4"]
+    assert content["hosts"] == {}
+
+
+def test_local_host_does_not_need_an_address():
+    (host,) = Inventory.from_dict({"hosts": {"me": {"connection": "local"}}})
+
+    assert host.connection == "local"
+    assert host.address == "localhost"
+
+
+def test_ssh_host_needs_an_address():
+    with pytest.raises(ValueError, match="ssh_address"):
+        Inventory.from_dict({"hosts": {"web": {"ssh_user": "admin"}}})
+
+
+def test_unknown_connection_is_rejected():
+    with pytest.raises(ValueError, match="unknown connection"):
+        Inventory.from_dict({"hosts": {"web": {"connection": "telnet"}}})
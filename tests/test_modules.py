@@ -0,0 +1,243 @@
+import base64
+import hashlib
+import io
+import shutil
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from mylittleansible.core import executor
+from mylittleansible.core.connection import Connection
+from mylittleansible.modules.command import CommandModule
+from mylittleansible.modules.copy import CopyModule
+from mylittleansible.modules.base import SEPARATOR, parse_statuses, report_status
+from mylittleansible.modules.service import ServiceModule
+from mylittleansible.modules.sysctl import DROPIN_HEADER, SysctlModule, is_true, render_dropin
+from mylittleansible.modules.template import TemplateModule
+
+
+def test_command_runs(local, tmp_path):
+    CommandModule({"command": f"touch {tmp_path}/done"}, 1).process(local)
+
+    assert (tmp_path / "done").exists()
+
+
+def test_command_failure_raises(local):
+    with pytest.raises(RuntimeError, match="exit status 1"):
+        CommandModule({"command": "false"}, 1).process(local)
+
+
+def test_command_with_large_output_does_not_hang(local):
+    thread = threading.Thread(target=CommandModule({"command": "seq 1 100000"}, 1).process, args=(local,), daemon=True)
+    thread.start()
+    thread.join(10)
+
+    assert not thread.is_alive()
+
+
+def test_command_batch_runs_every_command_and_raises_on_failure(local, tmp_path):
+    module = CommandModule.batch(
+        [
+            CommandModule({"command": f"touch {tmp_path}/first"}, 1),
+            CommandModule({"command": "false"}, 1),
+            CommandModule({"command": f"touch {tmp_path}/last"}, 1),
+        ]
+    )
+
+    with pytest.raises(RuntimeError, match="1/3 command"):
+        module.process(local)
+    assert (tmp_path / "first").exists()
+    assert (tmp_path / "last").exists()
+
+
+def test_reported_statuses_are_parsed_from_mixed_output(local):
+    script = f"printf 'no newline'; {report_status(0)}; false; {report_status(1)}"
+    stdin, stdout, stderr = local.run_command(script)
+
+    assert parse_statuses(stdout.read().decode()) == {0: 0, 1: 1}
+
+
+def test_command_dry_run_does_nothing(local, tmp_path):
+    CommandModule({"command": f"touch {tmp_path}/done"}, 1, dry_run=True).process(local)
+
+    assert not (tmp_path / "done").exists()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    source = tmp_path / "src"
+    (source / "sub").mkdir(parents=True)
+    (source / "a").write_text("a")
+    (source / "sub" / "b").write_text("b")
+    return source
+
+
+def test_copy_directory_then_skip_unchanged(fake_sudo, tree, tmp_path):
+    dest = tmp_path / "dest"
+    module = CopyModule({"src": str(tree), "dest": str(dest)}, 1)
+
+    module.process(fake_sudo)
+    assert (dest / "a").read_text() == "a"
+    assert (dest / "sub" / "b").read_text() == "b"
+
+    fake_sudo.commands.clear()
+    CopyModule({"src": str(tree), "dest": str(dest)}, 1).process(fake_sudo)
+    assert len(fake_sudo.commands) == 1
+
+
+def test_copy_loop_is_one_checksum_call_and_one_install(fake_sudo, tree, tmp_path):
+    single = tmp_path / "single.txt"
+    single.write_text("single")
+    (tmp_path / "files").mkdir()
+    (tmp_path / "files" / "single.txt").write_text("old")
+    module = CopyModule.batch(
+        [
+            CopyModule({"src": str(tree), "dest": str(tmp_path / "tree")}, 1),
+            CopyModule({"src": str(single), "dest": str(tmp_path / "files"), "backup": True}, 1),
+        ]
+    )
+
+    module.process(fake_sudo)
+
+    assert len(fake_sudo.commands) == 2
+    assert (tmp_path / "tree" / "sub" / "b").read_text() == "b"
+    assert (tmp_path / "files" / "single.txt").read_text() == "single"
+    assert (tmp_path / "files" / "single.txt.backup").exists() is False
+    backup = Path(f"/tmp{tmp_path}/files/single.txt.backup")
+    try:
+        assert backup.read_text() == "old"
+    finally:
+        shutil.rmtree(f"/tmp{tmp_path}", ignore_errors=True)
+
+
+def test_copy_missing_source_raises(fake_sudo, tmp_path):
+    with pytest.raises(RuntimeError, match="copy item"):
+        CopyModule({"src": str(tmp_path / "missing"), "dest": str(tmp_path / "dest")}, 1).process(fake_sudo)
+
+
+def test_template_streams_and_reports_unchanged(fake_sudo, tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "hosts.j2").write_text("{% for i in range(n) %}host{{ i }}\n{% endfor %}")
+    dest = tmp_path / "hosts"
+    module = TemplateModule({"src": "hosts.j2", "dest": str(dest), "vars": {"n": 20000}}, 1)
+
+    module.process(fake_sudo)
+    expected = "".join(f"host{i}\n" for i in range(20000))
+    assert dest.read_text() == expected
+    assert dest.stat().st_mode & 0o777 == 0o644
+
+    with caplog.at_level("INFO"):
+        module.process(fake_sudo)
+    assert "changed=False" in caplog.text
+    assert hashlib.sha256(dest.read_bytes()).hexdigest() == hashlib.sha256(expected.encode()).hexdigest()
+
+
+def test_sudo_failure_does_not_leak_the_password(fake_sudo):
+    fake_sudo.password = "hunter2"
+
+    with pytest.raises(RuntimeError) as error:
+        ServiceModule({"name": "nonexistent-svc", "state": "start"}, 1).process(fake_sudo)
+
+    assert "hunter2" not in str(error.value)
+    assert fake_sudo.commands[0].startswith("sudo -S -p '' ")
+
+
+class ScriptedConnection(Connection):
+    """
+    Connection answering the sysctl read command with canned values and recording every command.
+    """
+
+    hostname = "scripted"
+
+    def __init__(self, current: str, dropin: str = "") -> None:
+        self.current = current
+        self.dropin = dropin
+        self.commands = []
+
+    def run_command(self, command, pty=False) -> tuple:
+        self.commands.append(command)
+        output = f"{self.current}{SEPARATOR}\n{self.dropin}" if command.startswith("sysctl -e") else ""
+        channel = SimpleNamespace(recv_exit_status=lambda: 0)
+        stdout, stderr = io.BytesIO(output.encode()), io.BytesIO()
+        stdout.channel = stderr.channel = channel
+        return io.BytesIO(), stdout, stderr
+
+
+@pytest.mark.parametrize(
+    "flag, expected", [(True, True), ("yes", True), (False, False), ("false", False), (None, False)]
+)
+def test_is_true_accepts_yaml_booleans_and_strings(flag, expected):
+    assert is_true(flag) is expected
+
+
+def test_render_dropin_updates_keys_in_place_and_keeps_other_lines():
+    current = f"{DROPIN_HEADER}\n# tuned for the proxy\nnet.core.somaxconn = 128\nvm.swappiness=10\n"
+
+    rendered = render_dropin(
+        current,
+        [{"attribute": "vm.swappiness", "value": 1}, {"attribute": "fs.file-max", "value": "2  000"}],
+        DROPIN_HEADER,
+    )
+
+    assert rendered == (
+        f"{DROPIN_HEADER}\n# tuned for the proxy\nnet.core.somaxconn = 128\nvm.swappiness = 1\nfs.file-max = 2 000\n"
+    )
+
+
+def test_sysctl_boolean_permanent_writes_the_dropin():
+    connection = ScriptedConnection("vm.swappiness = 60\n")
+
+    SysctlModule({"attribute": "vm.swappiness", "value": 10, "permanent": True}, 1).process(connection)
+
+    write = connection.commands[1]
+    assert "sysctl --load" in write
+    encoded = base64.b64encode(f"{DROPIN_HEADER}\nvm.swappiness = 10\n".encode()).decode()
+    assert encoded in write
+
+
+def test_sysctl_not_permanent_only_sets_the_runtime_value():
+    connection = ScriptedConnection("vm.swappiness = 60\n")
+
+    SysctlModule({"attribute": "vm.swappiness", "value": 10, "permanent": False}, 1).process(connection)
+
+    assert "sysctl --load" not in connection.commands[1]
+    assert "sysctl -q -w vm.swappiness=10" in connection.commands[1]
+
+
+def test_sysctl_unchanged_values_only_issue_the_read_call():
+    connection = ScriptedConnection("vm.swappiness = 10\n", f"{DROPIN_HEADER}\nvm.swappiness = 10\n")
+
+    SysctlModule({"attribute": "vm.swappiness", "value": 10, "permanent": True}, 1).process(connection)
+
+    assert len(connection.commands) == 1
+
+
+def test_op_sysctl_writes_and_loads_the_dropin_once(tmp_path, monkeypatch):
+    commands = []
+    current = {"vm.swappiness": "60"}
+
+    def run(command):
+        commands.append(command)
+        if command.startswith("sysctl -e"):
+            return 0, "".join(f"{key} = {value}\n" for key, value in current.items()), ""
+        return 0, "", ""
+
+    monkeypatch.setattr(executor, "_run", run)
+    dropin = tmp_path / "90-mylittleansible.conf"
+    task = {
+        "module": "sysctl",
+        "file": str(dropin),
+        "header": DROPIN_HEADER,
+        "entries": [{"index": 1, "attribute": "vm.swappiness", "value": 10, "permanent": True}],
+    }
+
+    assert executor.op_sysctl(task)["changed"] is True
+    assert dropin.read_text() == f"{DROPIN_HEADER}\nvm.swappiness = 10\n"
+    assert any(command.startswith("sysctl --load") for command in commands)
+
+    commands.clear()
+    current["vm.swappiness"] = "10"
+    assert executor.op_sysctl(task)["changed"] is False
+    assert [command for command in commands if not command.startswith("sysctl -e")] == []
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from mylittleansible.core.inventory import Inventory
+from mylittleansible.core.play import run_play
+from mylittleansible.core.runner import Runner, make_throttles
+
+
+def local_inventory(*names):
+    return Inventory.from_dict({"hosts": {name: {"connection": "local"} for name in names}})
+
+
+def test_failed_task_is_reported_and_skips_the_host(tmp_path):
+    todos = [
+        {"module": "command", "params": {"command": "false"}},
+        {"module": "command", "params": {"command": f"touch {tmp_path}/after"}},
+    ]
+
+    report = Runner(local_inventory("a"), todos, dry_run=False).run()
+
+    assert report.failed == {"a": 1}
+    assert report.ok == {}
+    assert not (tmp_path / "after").exists()
+
+
+def test_max_fail_percentage_stops_the_rollout(tmp_path):
+    todos = [{"module": "command", "params": {"command": f"touch {tmp_path}/ran; false"}}]
+
+    report = run_play(local_inventory("a", "b"), todos, serial=1, max_fail_percentage=0)
+
+    assert report.failed_hosts == ["a"]
+    assert "b" not in report.ok
+
+
+def test_loop_runs_every_item(tmp_path):
+    todos = [{"module": "command", "params": {"command": f"touch {tmp_path}/{{{{ item }}}}"}, "loop": ["x", "y"]}]
+
+    report = run_play(local_inventory("a"), todos)
+
+    assert report.ok == {"a": 1}
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["x", "y"]
+
+
+def test_sharded_report_counts_failed_tasks():
+    todos = [{"module": "command", "params": {"command": "false"}}]
+
+    report = run_play(local_inventory("a", "b", "c"), todos, workers=2)
+
+    assert sorted(report.failed_hosts) == ["a", "b", "c"]
+    assert report.ok == {}
+    assert "failed=3" in report.summary()
+
+
+@pytest.mark.parametrize("value", ["10%", True, -1, 101])
+def test_invalid_max_fail_percentage_is_rejected_before_running(tmp_path, value):
+    todos = [{"module": "command", "params": {"command": f"touch {tmp_path}/ran"}}]
+
+    with pytest.raises(ValueError, match="max_fail_percentage"):
+        run_play(local_inventory("a", "b"), todos, serial=1, max_fail_percentage=value)
+    assert not (tmp_path / "ran").exists()
+
+
+@pytest.mark.parametrize("value", [True, 0, "2"])
+def test_invalid_throttle_is_rejected(value):
+    with pytest.raises(ValueError, match="throttle"):
+        make_throttles([{"module": "command", "throttle": value}], threading.BoundedSemaphore)
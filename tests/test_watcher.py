@@ -0,0 +1,112 @@
+import yaml
+
+import mylittleansible.core.pool as pool
+from mylittleansible.core.inventory import Inventory
+from mylittleansible.core.play import parse_play
+from mylittleansible.core.watcher import FileWatcher, Watcher
+
+
+def write_yaml(path, content):
+    path.write_text(yaml.safe_dump(content))
+
+
+def local_hosts(*names):
+    return {"hosts": {name: {"connection": "local"} for name in names}}
+
+
+def make_watcher(tmp_path, monkeypatch, fake_sudo):
+    """
+    Build a watcher over a template task and a command task on two local hosts, recording what it applies.
+    """
+    closed = []
+
+    class ClosingConnection(type(fake_sudo)):
+        def close(self) -> None:
+            closed.append(self.hostname)
+
+    monkeypatch.setitem(pool.BACKENDS, "local", ClosingConnection)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "motd.j2").write_text("hello {{ name }}\n")
+    write_yaml(tmp_path / "inventory.yml", local_hosts("a", "b"))
+    write_yaml(
+        tmp_path / "todos.yml",
+        [
+            {"module": "template", "params": {"src": "motd.j2", "dest": str(tmp_path / "motd"), "vars": {"name": "x"}}},
+            {"module": "command", "params": {"command": "true"}},
+        ],
+    )
+    watcher = Watcher(
+        str(tmp_path / "inventory.yml"),
+        str(tmp_path / "todos.yml"),
+        lambda: Inventory.from_dict(yaml.safe_load((tmp_path / "inventory.yml").read_text())),
+        lambda: parse_play(yaml.safe_load((tmp_path / "todos.yml").read_text()))[0],
+    )
+
+    applied = []
+    apply = watcher._apply
+
+    def record(hosts, indices):
+        hosts = list(hosts)
+        applied.append(([host.name for host in hosts], indices))
+        apply(hosts, indices)
+
+    monkeypatch.setattr(watcher, "_apply", record)
+    watcher._track()
+    watcher._apply(watcher.inventory, None)
+    return watcher, applied, closed
+
+
+def test_file_watcher_reports_each_change_once(tmp_path):
+    path = tmp_path / "file"
+    path.write_text("one")
+    files = FileWatcher()
+    files.track([str(path)])
+
+    path.write_text("three")
+
+    assert files.changed() == {str(path)}
+    assert files.changed() == set()
+
+
+def test_template_edit_only_reruns_its_task(tmp_path, monkeypatch, fake_sudo):
+    watcher, applied, closed = make_watcher(tmp_path, monkeypatch, fake_sudo)
+
+    (tmp_path / "motd.j2").write_text("hello again {{ name }}\n")
+    watcher.poll()
+
+    assert applied[-1] == (["a", "b"], {1})
+    assert (tmp_path / "motd").read_text() == "hello again x"
+
+
+def test_changed_todo_only_reruns_its_index(tmp_path, monkeypatch, fake_sudo):
+    watcher, applied, closed = make_watcher(tmp_path, monkeypatch, fake_sudo)
+    todos = yaml.safe_load((tmp_path / "todos.yml").read_text())
+    todos[1]["params"]["command"] = "true && true"
+
+    write_yaml(tmp_path / "todos.yml", todos)
+    watcher.poll()
+
+    assert applied[-1] == (["a", "b"], {2})
+
+
+def test_new_host_gets_every_task(tmp_path, monkeypatch, fake_sudo):
+    watcher, applied, closed = make_watcher(tmp_path, monkeypatch, fake_sudo)
+
+    write_yaml(tmp_path / "inventory.yml", local_hosts("a", "b", "c"))
+    watcher.poll()
+
+    assert applied[1:] == [(["c"], None)]
+
+
+def test_removed_host_connection_is_closed(tmp_path, monkeypatch, fake_sudo):
+    watcher, applied, closed = make_watcher(tmp_path, monkeypatch, fake_sudo)
+    write_yaml(tmp_path / "inventory.yml", local_hosts("a", "b", "c"))
+    watcher.poll()
+    assert "c" in [host.name for host in watcher.pool.connections]
+
+    write_yaml(tmp_path / "inventory.yml", local_hosts("a", "b"))
+    watcher.poll()
+
+    assert [host.name for host in watcher.pool.connections] == ["a", "b"]
+    assert closed == ["localhost"]
+    assert len(applied) == 2